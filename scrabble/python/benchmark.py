@@ -0,0 +1,217 @@
+"""
+Time the move generator stage by stage on a corpus of positions and check it against golden move lists
+
+Usage: python3 benchmark.py [--words WORDS] [--repeat N] [--output RESULTS.json] [--update-golden]
+
+The golden move lists were made from ../dictionary/opsd_4th_ed.txt and are only checked when the
+lexicon is built from that same word list:
+
+    python3 benchmark.py --words ../dictionary/opsd_4th_ed.txt
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, TypeVar
+
+from board import Board, CellCoord, Position
+from cross_check import cross_checks
+from dawg import Dawg
+from lexicon import Lexicon, build_lexicon, nwl_2020, read_word_list
+from rules import Play, word_score
+from solver import SolverState, best_plays, generate_all_plays
+
+POSITIONS_PATH = "benchmarks/positions.json"
+GOLDEN_PATH = "benchmarks/golden.json"
+GOLDEN_BEST_PLAYS = 10
+
+T = TypeVar("T")
+
+
+@dataclass
+class BenchmarkPosition:
+    name: str
+    category: str
+    board: Board
+    rack: list[str]
+    blanks: set[CellCoord]  # blank squares already on the board, same convention as word_score
+
+
+def load_positions(path: str = POSITIONS_PATH) -> list[BenchmarkPosition]:
+    with open(path) as file:
+        entries = json.load(file)
+    return [
+        BenchmarkPosition(
+            entry["name"],
+            entry["category"],
+            Board.from_string("\n".join(entry["board"])),
+            list(entry["rack"]),
+            {(row, col) for row, col in entry["blanks"]},
+        )
+        for entry in entries
+    ]
+
+
+def lexicon_fingerprint(dawg: Dawg) -> str:
+    """Identifies the word list a DAWG was built from, since construction is deterministic"""
+    digest = hashlib.sha256()
+    for values in [dawg.first_edge, dawg.edge_letters, dawg.edge_targets, dawg.terminal]:
+        digest.update(bytes(values))
+    return digest.hexdigest()[:16]
+
+
+def play_record(play: Play) -> str:
+    blanks = " ".join(f"{row},{col}" for row, col in sorted(play.blanks))
+    return f"{play.score} {play.word} {play.pos.dir.name} {play.pos.row} {play.pos.col} {blanks}".rstrip()
+
+
+def golden_entry(plays: list[Play]) -> dict[str, Any]:
+    records = [play_record(play) for play in plays]
+    return {
+        "count": len(records),
+        "sha256": hashlib.sha256("\n".join(records).encode()).hexdigest(),
+        "best": records[-GOLDEN_BEST_PLAYS:],
+    }
+
+
+def timed(function: Callable[[], T], repeat: int) -> tuple[list[float], T]:
+    """Seconds taken by each of repeat calls, and the result of the last one"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def warm_board(lexicon: Lexicon, position: BenchmarkPosition) -> Board:
+    """A copy of the position's board with its cross-checks already computed"""
+    board = position.board.copy()
+    cross_checks(board, lexicon.dawg)
+    return board
+
+
+def find_options(lexicon: Lexicon, board: Board, rack: list[str]) -> list[Any]:
+    return SolverState(lexicon.dawg, board, rack.copy()).find_all_options()
+
+
+def find_plays(lexicon: Lexicon, board: Board, rack: list[str], blanks: set[CellCoord]) -> list[Play]:
+    return generate_all_plays(lexicon, board, rack.copy(), blanks)
+
+
+def find_best_play(lexicon: Lexicon, board: Board, rack: list[str], blanks: set[CellCoord]) -> list[Play]:
+    return best_plays(lexicon, board, rack.copy(), blanks, 1)
+
+
+def rescore(lexicon: Lexicon, board: Board, options: list[Any], blanks: set[CellCoord]) -> list[Any]:
+    """Score raw find_all_options plays with word_score, the way typed words are scored in the game"""
+    return [
+        word_score(board, lexicon.dawg, letters, Position(pos.dir, 14 - pos.row, pos.col), True, new_blanks | blanks)
+        for pos, letters, new_blanks in options
+    ]
+
+
+def run_position(lexicon: Lexicon, position: BenchmarkPosition, repeat: int) -> tuple[list[dict[str, Any]], list[Play]]:
+    results: list[dict[str, Any]] = []
+
+    def record(stage: str, times: list[float], plays: int) -> None:
+        results.append({
+            "position": position.name,
+            "category": position.category,
+            "stage": stage,
+            "best_ms": min(times) * 1000,
+            "mean_ms": statistics.mean(times) * 1000,
+            "plays": plays,
+        })
+
+    def cold_cross_checks():
+        board = position.board.copy()
+        board.cross_check_cache = None
+        return cross_checks(board, lexicon.dawg)
+
+    times, _ = timed(cold_cross_checks, repeat)
+    record("cross_check", times, 0)
+
+    board = warm_board(lexicon, position)
+    times, options = timed(partial(find_options, lexicon, board, position.rack), repeat)
+    record("find_all_options", times, len(options))
+
+    times, scored = timed(partial(rescore, lexicon, board, options, position.blanks), repeat)
+    record("word_score", times, sum(result.is_ok() for result in scored))
+
+    times, all_plays = timed(partial(find_plays, lexicon, board, position.rack, position.blanks), repeat)
+    record("generate_all_plays", times, len(all_plays))
+
+    times, best = timed(partial(find_best_play, lexicon, board, position.rack, position.blanks), repeat)
+    record("best_play", times, len(best))
+    assert best == all_plays[-1:], f"best_plays disagrees with generate_all_plays on {position.name}"
+    return results, all_plays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each move generator stage on a corpus of positions")
+    parser.add_argument("--words", help="word list to build the lexicon from instead of the default one")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--positions", default=POSITIONS_PATH)
+    parser.add_argument("--golden", default=GOLDEN_PATH)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--update-golden", action="store_true", help="store the plays found as the new golden lists")
+    args = parser.parse_args()
+
+    lexicon = build_lexicon(read_word_list(args.words)) if args.words else nwl_2020()
+    fingerprint = lexicon_fingerprint(lexicon.dawg)
+    try:
+        with open(args.golden) as file:
+            golden = json.load(file)
+    except FileNotFoundError:
+        golden = {"lexicon": None, "positions": {}}
+    check_golden = golden["lexicon"] == fingerprint and not args.update_golden
+
+    results, failures, found = [], [], dict()
+    for position in load_positions(args.positions):
+        position_results, plays = run_position(lexicon, position, args.repeat)
+        results += position_results
+        found[position.name] = golden_entry(plays)
+        if check_golden and golden["positions"].get(position.name) != found[position.name]:
+            failures.append(position.name)
+        for result in position_results:
+            print(f"{position.name:>18} {result['stage']:>18} "
+                  f"{result['plays']:6d} plays {result['best_ms']:9.1f} ms")
+
+    if args.update_golden:
+        with open(args.golden, "w") as file:
+            json.dump({"lexicon": fingerprint, "words": args.words, "positions": found}, file, indent=2)
+            file.write("\n")
+        print(f"Updated {args.golden}")
+    elif not check_golden:
+        print(f"Golden move lists skipped: they were made with {golden.get('words')}, not this lexicon")
+    elif failures:
+        print(f"Plays differ from the golden move lists for: {', '.join(failures)}")
+    else:
+        print("All plays match the golden move lists")
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "lexicon": fingerprint,
+            "repeat": args.repeat,
+            "golden": {"checked": check_golden, "failures": failures},
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
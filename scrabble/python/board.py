@@ -1,14 +1,24 @@
 # Inital code taken from https://github.com/boringcactus/Appel-Jacobson-scrabble/blob/canon/board.py
 
-import copy
 import itertools as it
 from dataclasses import dataclass
 from enum import IntEnum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from cross_check import CrossChecks
 
 Letter= str # synonym for str, but make it clear that it's a letter
 
 CellCoord = tuple[int, int]
 
+# Every mutation of any board gets a fresh version, so equal versions mean equal tiles
+_versions = it.count(1)
+
+# Tiles are stored as their character code, with EMPTY for "."
+EMPTY = 0
+_LETTERS = ["."] + [chr(code) for code in range(1, 256)]
+
 
 class Direction(IntEnum):
     ACROSS = 1
@@ -24,38 +34,102 @@ class Position:
 
 class Board:
     size: int
-    _tiles: list[list[Letter]]
+    version: int
+    _cells: bytearray  # row-major tile codes
+    _cells_t: bytearray  # the same tiles column-major, so a column is a contiguous slice
+    _occupied: int  # bit row * size + col is set for every filled square
+    cross_check_cache: "CrossChecks | None"
 
     def __init__(self) -> None:
         self.size = 15
-        self._tiles = [["."] * self.size for i in range(self.size)]
+        self.version = 0
+        self._cells = bytearray(self.size * self.size)
+        self._cells_t = bytearray(self.size * self.size)
+        self._occupied = 0
+        self.cross_check_cache = None
 
     def __str__(self) -> str:
-        return "\n".join("".join(x if x != "." else "_" for x in row) for row in self._tiles)
+        return "\n".join(self.row(row).replace(b"\0", b"_").decode() for row in range(self.size))
 
-    def all_positions(self) -> list[CellCoord]:
-        return list(it.product(range(0, self.size), range(0, self.size)))
+    @classmethod
+    def from_string(cls, text: str) -> "Board":
+        """Inverse of __str__"""
+        board = cls()
+        for row, line in enumerate(text.split()):
+            for col, tile in enumerate(line):
+                if tile != "_":
+                    board.set_tile((row, col), tile)
+        return board
+
+    def all_positions(self) -> tuple[CellCoord, ...]:
+        return _ALL_POSITIONS
 
     def tile(self, pos: CellCoord) -> Letter:
         row, col = pos
-        return self._tiles[row][col]
+        return _LETTERS[self._cells[row * self.size + col]]
 
     def set_tile(self, pos: CellCoord, tile: Letter) -> None:
         row, col = pos
-        self._tiles[row][col] = tile
+        code = EMPTY if tile == "." else ord(tile)
+        self._cells[row * self.size + col] = code
+        self._cells_t[col * self.size + row] = code
+        bit = 1 << (row * self.size + col)
+        self._occupied = self._occupied | bit if code != EMPTY else self._occupied & ~bit
+        self.version = next(_versions)
+
+    def row(self, row: int) -> bytes:
+        return bytes(self._cells[row * self.size:(row + 1) * self.size])
+
+    def column(self, col: int) -> bytes:
+        return bytes(self._cells_t[col * self.size:(col + 1) * self.size])
+
+    def snapshot(self) -> bytes:
+        return bytes(self._cells)
 
     def in_bounds(self, pos: CellCoord) -> bool:
         row, col = pos
         return row >= 0 and row < self.size and col >= 0 and col < self.size
 
     def is_empty(self, pos: CellCoord) -> bool:
-        return self.in_bounds(pos) and self.tile(pos) == "."
+        row, col = pos
+        return 0 <= row < self.size and 0 <= col < self.size and self._cells[row * self.size + col] == EMPTY
 
     def is_filled(self, pos: CellCoord) -> bool:
-        return self.in_bounds(pos) and self.tile(pos) != "."
+        row, col = pos
+        return 0 <= row < self.size and 0 <= col < self.size and self._cells[row * self.size + col] != EMPTY
 
     def is_first_turn(self) -> bool:
-        return all("." == c for c in it.chain(*self._tiles))
+        return self._occupied == 0
+
+    def anchors(self) -> list[CellCoord]:
+        """Empty squares next to a filled one, in row-major order"""
+        occupied = self._occupied
+        neighbors = (
+            (occupied << 1 & ~_FIRST_COLUMN)
+            | (occupied >> 1 & ~_LAST_COLUMN)
+            | occupied << self.size
+            | occupied >> self.size
+        )
+        anchors = neighbors & ~occupied & _ALL_SQUARES
+        result = []
+        while anchors:
+            square = (anchors & -anchors).bit_length() - 1
+            result.append(divmod(square, self.size))
+            anchors &= anchors - 1
+        return result
 
     def copy(self) -> "Board":  # This is a recursive type annotation, actually a limitation of mypy
-        return copy.deepcopy(self)
+        board = Board.__new__(Board)
+        board.size = self.size
+        board.version = self.version
+        board._cells = self._cells.copy()
+        board._cells_t = self._cells_t.copy()
+        board._occupied = self._occupied
+        board.cross_check_cache = self.cross_check_cache.copy() if self.cross_check_cache is not None else None
+        return board
+
+
+_ALL_POSITIONS = tuple(it.product(range(0, 15), range(0, 15)))
+_ALL_SQUARES = (1 << 15 * 15) - 1
+_FIRST_COLUMN = sum(1 << row * 15 for row in range(15))
+_LAST_COLUMN = _FIRST_COLUMN << 14
@@ -0,0 +1,75 @@
+"""
+Find the emoji for every word in the lexicon ahead of time, so the game shows them without running the model
+
+Usage: python3 compile_emojis.py [--workers N] [--batch-size N] [OUTPUT]
+       python3 compile_emojis.py --atlas
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from emoji_manager import (
+    ATLAS_PATH,
+    WORD_EMOJIS_PATH,
+    EmojiManager,
+    write_emoji_atlas,
+    write_word_emojis,
+)
+from lexicon import nwl_2020
+
+# Per worker process state, set up by _init_worker
+_manager: EmojiManager
+
+
+def _init_worker(threads: int) -> None:
+    global _manager
+    # Each worker gets its share of the cores instead of every worker using all of them. torch reads
+    # this when it is first imported, which is when the model is loaded below.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    _manager = EmojiManager()
+    _manager._load_model()
+
+
+def _match_batch(entries: list[tuple[str, str]]) -> list[str | None]:
+    """The emoji get_emoji_for_definition would pick for each word and definition"""
+    return _manager.match_definitions(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the word to emoji table for every word in the lexicon")
+    parser.add_argument("output", nargs="?", default=WORD_EMOJIS_PATH, help="word to emoji table to write")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes to encode definitions in, 0 for this process only")
+    parser.add_argument("--batch-size", type=int, default=1024, help="definitions per batch")
+    parser.add_argument("--atlas", action="store_true",
+                        help="instead pack the emoji images generated so far into one atlas image for the game")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.atlas:
+        count = write_emoji_atlas()
+        print(f"Packed {count} emojis into {ATLAS_PATH} in {time.perf_counter() - start:.1f}s")
+        return
+
+    definitions = nwl_2020().definitions
+    words = [definitions.key(i) for i in range(len(definitions))]
+    entries = [(word, definitions[word]) for word in words]
+    batches = [entries[i:i + args.batch_size] for i in range(0, len(entries), args.batch_size)]
+
+    if args.workers:
+        threads = max(1, (os.cpu_count() or 1) // args.workers)
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(threads,)) as executor:
+            emojis = [emoji_char for batch in executor.map(_match_batch, batches) for emoji_char in batch]
+    else:
+        _init_worker(os.cpu_count() or 1)
+        emojis = [emoji_char for batch in batches for emoji_char in _match_batch(batch)]
+
+    write_word_emojis(dict(zip(words, emojis)), args.output)
+    found = sum(emoji_char is not None for emoji_char in emojis)
+    print(f"Wrote emojis for {found} of {len(words)} words to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
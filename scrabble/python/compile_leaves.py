@@ -0,0 +1,25 @@
+"""
+Build the leave value table and write it as a binary file that the game and selfplay.py load
+
+Usage: python3 compile_leaves.py [OUTPUT]
+"""
+
+import argparse
+import time
+
+from leaves import LEAVES_PATH, build_leave_table, write_leave_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the leave value table for every leave of up to 6 tiles")
+    parser.add_argument("output", nargs="?", default=LEAVES_PATH, help="leave table to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = build_leave_table()
+    write_leave_table(table, args.output)
+    print(f"Wrote {len(table.values)} leaves to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Compile the word list and its definitions into a single binary lexicon file
+
+Usage: python3 compile_lexicon.py [WORDS] [OUTPUT]
+"""
+
+import argparse
+import time
+
+from lexicon import LEXICON_PATH, WORDS_PATH, compile_lexicon
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a word list into a memory-mappable lexicon")
+    parser.add_argument("words", nargs="?", default=WORDS_PATH, help="word list, one '<WORD> <definition>' per line")
+    parser.add_argument("output", nargs="?", default=LEXICON_PATH, help="compiled lexicon to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lexicon = compile_lexicon(args.words, args.output)
+    print(f"DAWG: {lexicon.dawg.node_count()} nodes, {lexicon.dawg.edge_count()} edges")
+    print(f"Definitions: {len(lexicon.definitions)} words")
+    print(f"Wrote {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
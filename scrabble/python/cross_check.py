@@ -0,0 +1,107 @@
+# Cross-checks as 26-bit letter masks per square, cached on the board and updated incrementally.
+# Bit i of a mask is set when chr(ord("A") + i) can be placed on the square without forming an
+# invalid perpendicular word.
+
+import numpy as np
+
+from board import Board, Direction, Letter
+from dawg import Dawg
+from solver_stats import SolverStats
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALL_LETTERS = (1 << len(ALPHABET)) - 1
+
+
+def letter_bit(letter: Letter) -> int:
+    return 1 << (ord(letter) - ord("A"))
+
+
+# letter_bit by character code, 0 for anything that is not a letter
+LETTER_BITS = [letter_bit(chr(code)) if chr(code) in ALPHABET else 0 for code in range(256)]
+
+
+def letters_in(mask: int) -> set[Letter]:
+    return {letter for i, letter in enumerate(ALPHABET) if mask >> i & 1}
+
+
+class CrossChecks:
+    # masks[dir][row * size + col] constrains tiles played in direction dir, so for
+    # Direction.ACROSS it is determined by the column through the square and vice versa
+    masks: dict[Direction, list[int]]
+    snapshot: bytes | None
+    version: int
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.masks = {direction: [ALL_LETTERS] * (size * size) for direction in Direction}
+        self.snapshot = None
+        self.version = -1
+
+    def copy(self) -> "CrossChecks":
+        other = CrossChecks(self.size)
+        other.masks = {direction: masks.copy() for direction, masks in self.masks.items()}
+        other.snapshot = self.snapshot
+        other.version = self.version
+        return other
+
+    def refresh(self, board: Board, dictionary: Dawg, stats: SolverStats | None = None) -> None:
+        """Recompute the lines that changed since the last refresh"""
+        if board.version == self.version:
+            return
+        snapshot = board.snapshot()
+        size = self.size
+        if self.snapshot is None:
+            rows = cols = set(range(size))
+        else:
+            changed = np.flatnonzero(np.frombuffer(snapshot, np.uint8) != np.frombuffer(self.snapshot, np.uint8))
+            rows = {int(i) // size for i in changed}
+            cols = {int(i) % size for i in changed}
+        for col in cols:
+            for row in range(size):
+                self.masks[Direction.ACROSS][row * size + col] = self.compute(board, dictionary, Direction.ACROSS, row, col, stats)
+        for row in rows:
+            for col in range(size):
+                self.masks[Direction.DOWN][row * size + col] = self.compute(board, dictionary, Direction.DOWN, row, col, stats)
+        if stats is not None:
+            stats.cross_check_squares += size * (len(rows) + len(cols))
+        self.snapshot = snapshot
+        self.version = board.version
+
+    @staticmethod
+    def compute(board: Board, dictionary: Dawg, direction: Direction, row: int, col: int,
+                stats: SolverStats | None = None) -> int:
+        if board.is_filled((row, col)):
+            return 0
+        row_delta, col_delta = (1, 0) if direction == Direction.ACROSS else (0, 1)
+        letters_before = ""
+        r, c = row - row_delta, col - col_delta
+        while board.is_filled((r, c)):
+            letters_before = board.tile((r, c)) + letters_before
+            r, c = r - row_delta, c - col_delta
+        letters_after = ""
+        r, c = row + row_delta, col + col_delta
+        while board.is_filled((r, c)):
+            letters_after += board.tile((r, c))
+            r, c = r + row_delta, c + col_delta
+        if len(letters_before) == 0 and len(letters_after) == 0:
+            return ALL_LETTERS
+
+        node = dictionary.walk(letters_before)
+        if node < 0:
+            return 0
+        if stats is not None:
+            stats.cross_check_probes += dictionary.first_edge[node + 1] - dictionary.first_edge[node]
+        mask = 0
+        for edge in range(dictionary.first_edge[node], dictionary.first_edge[node + 1]):
+            child = dictionary.walk(letters_after, dictionary.edge_targets[edge])
+            if child >= 0 and dictionary.terminal[child]:
+                mask |= letter_bit(dictionary.edge_chars[edge])
+        return mask
+
+
+def cross_checks(board: Board, dictionary: Dawg, stats: SolverStats | None = None) -> CrossChecks:
+    """The board's cross-check cache, brought up to date"""
+    if board.cross_check_cache is None:
+        board.cross_check_cache = CrossChecks(board.size)
+    board.cross_check_cache.refresh(board, dictionary, stats)
+    return board.cross_check_cache
@@ -0,0 +1,157 @@
+# Minimized DAWG stored in flat integer arrays instead of one object per prefix.
+# Construction follows the incremental algorithm for sorted input from
+# Daciuk et al., "Incremental Construction of Minimal Acyclic Finite-State Automata" (2000).
+
+from array import array
+from collections.abc import Iterable, Sequence
+from functools import cached_property
+from typing import Self
+
+from board import Letter
+
+
+class _BuildNode:
+    __slots__ = ("id", "is_word", "edges")
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.is_word = False
+        self.edges: dict[Letter, _BuildNode] = dict()
+
+    def signature(self) -> tuple[bool, tuple[tuple[Letter, int], ...]]:
+        return self.is_word, tuple((letter, child.id) for letter, child in self.edges.items())
+
+
+class DawgNode:
+    """Lightweight view of one node, with the is_word and children of a trie node"""
+
+    __slots__ = ("dawg", "index")
+
+    def __init__(self, dawg: "Dawg", index: int) -> None:
+        self.dawg = dawg
+        self.index = index
+
+    @property
+    def is_word(self) -> bool:
+        return bool(self.dawg.terminal[self.index])
+
+    @property
+    def children(self) -> dict[Letter, "DawgNode"]:
+        dawg = self.dawg
+        return {
+            chr(dawg.edge_letters[edge]): DawgNode(dawg, dawg.edge_targets[edge])
+            for edge in range(dawg.first_edge[self.index], dawg.first_edge[self.index + 1])
+        }
+
+
+class Dawg:
+    # Node n owns the edges first_edge[n] .. first_edge[n + 1] - 1, sorted by letter.
+    # Node 0 is the root. Any buffer of ints works here (array, memoryview over an mmap, ...).
+    first_edge: Sequence[int]
+    edge_letters: Sequence[int]
+    edge_targets: Sequence[int]
+    terminal: Sequence[int]
+
+    def __init__(self, first_edge: Sequence[int], edge_letters: Sequence[int],
+                 edge_targets: Sequence[int], terminal: Sequence[int]) -> None:
+        self.first_edge = first_edge
+        self.edge_letters = edge_letters
+        self.edge_targets = edge_targets
+        self.terminal = terminal
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> Self:
+        root = _BuildNode(0)
+        next_id = 1
+        minimized: dict[tuple[bool, tuple[tuple[Letter, int], ...]], _BuildNode] = dict()
+        unchecked: list[tuple[_BuildNode, Letter, _BuildNode]] = []
+
+        def minimize(down_to: int) -> None:
+            while len(unchecked) > down_to:
+                parent, letter, child = unchecked.pop()
+                signature = child.signature()
+                if signature in minimized:
+                    parent.edges[letter] = minimized[signature]
+                else:
+                    minimized[signature] = child
+
+        previous_word = ""
+        for word in sorted(set(words)):
+            common = 0
+            for a, b in zip(word, previous_word):
+                if a != b:
+                    break
+                common += 1
+            minimize(common)
+            node = unchecked[-1][2] if unchecked else root
+            for letter in word[common:]:
+                child = _BuildNode(next_id)
+                next_id += 1
+                node.edges[letter] = child
+                unchecked.append((node, letter, child))
+                node = child
+            node.is_word = True
+            previous_word = word
+        minimize(0)
+
+        # Flatten breadth first so that the root ends up as node 0
+        index = {root.id: 0}
+        order = [root]
+        for node in order:
+            for child in node.edges.values():
+                if child.id not in index:
+                    index[child.id] = len(order)
+                    order.append(child)
+
+        first_edge = array("i", [0])
+        edge_letters = array("B")
+        edge_targets = array("i")
+        terminal = array("B")
+        for node in order:
+            for letter, child in node.edges.items():
+                edge_letters.append(ord(letter))
+                edge_targets.append(index[child.id])
+            first_edge.append(len(edge_letters))
+            terminal.append(node.is_word)
+        return cls(first_edge, edge_letters, edge_targets, terminal)
+
+    @cached_property
+    def edge_chars(self) -> str:
+        """edge_letters as a string, so move generators get letters without calling chr"""
+        return bytes(self.edge_letters).decode("ascii")
+
+    @property
+    def root(self) -> DawgNode:
+        return DawgNode(self, 0)
+
+    def node_count(self) -> int:
+        return len(self.terminal)
+
+    def edge_count(self) -> int:
+        return len(self.edge_letters)
+
+    def child(self, node: int, letter: Letter) -> int:
+        """Index of the child of node reached by letter, or -1"""
+        code = ord(letter)
+        edge_letters = self.edge_letters
+        for edge in range(self.first_edge[node], self.first_edge[node + 1]):
+            if edge_letters[edge] == code:
+                return self.edge_targets[edge]
+        return -1
+
+    def walk(self, word: str, node: int = 0) -> int:
+        for letter in word:
+            node = self.child(node, letter)
+            if node < 0:
+                return -1
+        return node
+
+    def lookup(self, word: str) -> DawgNode | None:
+        node = self.walk(word)
+        if node < 0:
+            return None
+        return DawgNode(self, node)
+
+    def is_word(self, word: str) -> bool:
+        node = self.walk(word)
+        return node >= 0 and bool(self.terminal[node])
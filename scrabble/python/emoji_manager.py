@@ -1,91 +1,257 @@
 
+# The model stack (sentence_transformers, torch, numpy, emoji) and PIL are imported where they are
+# first used, so importing this module is cheap and a game that never shows an emoji never loads them.
 import os
-from PIL import Image, ImageDraw, ImageFont
-from sentence_transformers import SentenceTransformer, util
-import emoji
-import numpy as np
+import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Path to Noto Color Emoji font
 FONT_PATH = "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf"
 CACHE_DIR = Path(__file__).parent.parent / "emojis" / "generated"
+# Encoded emoji descriptions, one file per model and emoji package version
+EMBEDDINGS_DIR = Path(__file__).parent.parent / "emojis" / "embeddings"
+EMBEDDINGS_VERSION = 1
+MODEL_NAME = "all-MiniLM-L6-v2"
+# Word to emoji table written by compile_emojis.py, one "WORD [codepoints]" line per word
+WORD_EMOJIS_PATH = Path(__file__).parent.parent / "emojis" / "word_emojis.txt"
+# Lowest similarity between a definition and an emoji description for the emoji to be shown
+SCORE_THRESHOLD = 0.39
+# Every generated emoji image packed into one image, see write_emoji_atlas
+ATLAS_PATH = Path(__file__).parent.parent / "emojis" / "atlas.png"
+ATLAS_INDEX_PATH = Path(__file__).parent.parent / "emojis" / "atlas.txt"
+# Pixels per emoji in the atlas; the Noto bitmaps are rendered at 128 pixels, so nothing is lost
+ATLAS_TILE_SIZE = 128
+ATLAS_COLUMNS = 32
+# Emojis remembered per (word, definition), for words shown again while browsing plays
+RESULT_CACHE_SIZE = 1024
+# Words of emoji names that say nothing about the emoji, left out of the whole-word index
+STOP_WORDS = {"a", "an", "and", "at", "for", "in", "of", "on", "the", "to", "with"}
 
 class EmojiManager:
     def __init__(self):
         self.model = None
         self.emoji_embeddings = None
         self.emoji_list = None
+        self.emoji_names: dict[str, str] | None = None
+        self.emoji_tokens: dict[str, list[str]] | None = None
+        self.word_emojis: dict[str, str | None] | None = None
+        self.results: OrderedDict[tuple[str, str], str | None] = OrderedDict()
         self.font_path = FONT_PATH
+        self.lock = threading.Lock()
+        self.data_lock = threading.Lock()
+        self.warm_up_thread = None
+        self.load_error = None
         
         # Ensure cache directory exists
         if not CACHE_DIR.exists():
             CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
     def _load_model(self):
-        if self.model is None:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self._initialize_emoji_database()
-
-    def _initialize_emoji_database(self):
-        # Create a curated list of emojis with descriptions
-        # We can extract this from the emoji package or use a predefined list
-        self.emoji_map = {}
-        descriptions = []
-        chars = []
-        
-        # Iterate over emojis to build a searchable database
-        for char, data in emoji.EMOJI_DATA.items():
-            if 'en' in data:
-                name = data['en'].strip(':').replace('_', ' ')
-                descriptions.append(name)
-                chars.append(char)
-
-        self.emoji_list = chars
-        self.emoji_descriptions = descriptions
-        
-        # Pre-compute embeddings for emoji descriptions
-        self.emoji_embeddings = self.model.encode(descriptions, convert_to_tensor=True)
+        with self.lock:
+            if self.model is None:
+                from sentence_transformers import SentenceTransformer
+
+                model = SentenceTransformer(MODEL_NAME)
+                self._initialize_emoji_database(model)
+                self.model = model
+
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded, so a lookup won't block on loading it"""
+        return self.model is not None
+
+    @property
+    def loading(self) -> bool:
+        return self.warm_up_thread is not None and not self.ready and self.load_error is None
+
+    @property
+    def has_word_emojis(self) -> bool:
+        """Whether the word table is there, so most words are looked up without the model"""
+        return self._load_word_emojis() is not None
+
+    def warm_up(self):
+        """Load the model on a background thread, if it isn't loaded or loading already"""
+        if self.warm_up_thread is None and not self.ready:
+            self.warm_up_thread = threading.Thread(target=self._warm_up, name="emoji-warm-up", daemon=True)
+            self.warm_up_thread.start()
+
+    def _warm_up(self):
+        try:
+            self._load_model()
+        except Exception as e:
+            self.load_error = e
+            print(f"Could not load emoji model: {e}")
+
+    def _load_emoji_data(self) -> tuple[dict[str, str], dict[str, list[str]]]:
+        """Emoji names and the indexes over them, which need the emoji package but not the model"""
+        with self.data_lock:
+            if self.emoji_names is not None and self.emoji_tokens is not None:
+                return self.emoji_names, self.emoji_tokens
+            import emoji
+
+            # Create a curated list of emojis with descriptions
+            # We can extract this from the emoji package or use a predefined list
+            descriptions = []
+            chars = []
+            # Skin tone swatches, hair styles and the skin tone variants of other emojis say nothing
+            # about a word, so they are left out of the whole-word index
+            unindexed = set()
+
+            # Iterate over emojis to build a searchable database
+            for char, data in emoji.EMOJI_DATA.items():
+                if 'en' in data:
+                    name = data['en'].strip(':').replace('_', ' ')
+                    descriptions.append(name)
+                    chars.append(char)
+                    if data.get("status") == emoji.STATUS["component"] or "skin tone" in name:
+                        unindexed.add(char)
+
+            self.emoji_list = chars
+            self.emoji_descriptions = descriptions
+            self.emoji_indices = {char: i for i, char in enumerate(chars)}
+            # First emoji with each name, and for each word of a name every emoji whose name has it
+            emoji_names: dict[str, str] = {}
+            emoji_tokens: dict[str, list[str]] = {}
+            for char, name in zip(chars, descriptions):
+                emoji_names.setdefault(name.lower(), char)
+                if char in unindexed:
+                    continue
+                for token in set(re.findall(r"[a-z0-9]+", name.lower())) - STOP_WORDS:
+                    emoji_tokens.setdefault(token, []).append(char)
+            self.emoji_tokens = emoji_tokens
+            self.emoji_names = emoji_names
+            return emoji_names, emoji_tokens
+
+    def _initialize_emoji_database(self, model):
+        self._load_emoji_data()
+
+        # Pre-compute embeddings for emoji descriptions, or load them from an earlier session
+        self.emoji_embeddings = self._load_embeddings(len(self.emoji_descriptions))
+        if self.emoji_embeddings is None:
+            self.emoji_embeddings = model.encode(self.emoji_descriptions, convert_to_numpy=True)
+            self._save_embeddings(self.emoji_embeddings)
+
+    def _embeddings_path(self) -> Path:
+        import emoji
+
+        return EMBEDDINGS_DIR / f"descriptions_v{EMBEDDINGS_VERSION}_{MODEL_NAME.replace('/', '_')}_emoji-{emoji.__version__}.npy"
+
+    def _load_embeddings(self, count: int):
+        import numpy as np
+
+        path = self._embeddings_path()
+        if not path.exists():
+            return None
+        try:
+            # Copy-on-write mapping: no copy is made, but torch can still wrap it as a writable array
+            embeddings = np.load(path, mmap_mode="c")
+        except (OSError, ValueError) as e:
+            print(f"Not using emoji embeddings cache: {e}")
+            return None
+        if embeddings.ndim != 2 or len(embeddings) != count:
+            print(f"Not using emoji embeddings cache: {path} has {len(embeddings)} rows, expected {count}")
+            return None
+        return embeddings
+
+    def _save_embeddings(self, embeddings) -> None:
+        import numpy as np
+
+        path = self._embeddings_path()
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            EMBEDDINGS_DIR.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as file:
+                np.save(file, np.asarray(embeddings, dtype=np.float32))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write emoji embeddings cache: {e}")
+
+    def _load_word_emojis(self) -> dict[str, str | None] | None:
+        """The precomputed emoji of every word, None for words without one, or None if there is no table"""
+        if self.word_emojis is None and WORD_EMOJIS_PATH.exists():
+            self.word_emojis = read_word_emojis(WORD_EMOJIS_PATH)
+        return self.word_emojis
+
+    def match_definitions(self, entries: list[tuple[str, str]], batch_size: int = 32,
+                          verbose: bool = False) -> list[str | None]:
+        """The emoji to show for each (word, definition), None when nothing is close enough
+
+        Words that index_match can't settle are matched by the similarity of "emoji of word:
+        definition" to the emoji descriptions. A word that is a word of several emoji names gets
+        the closest of those emojis, when it is at least SCORE_THRESHOLD similar.
+        """
+        import numpy as np
+        from sentence_transformers import util
 
-    def get_emoji_for_definition(self, word: str, definition: str) -> str:
         self._load_model()
-        
-        # 1. Try exact keyword match in emoji name
+        _, emoji_tokens = self._load_emoji_data()
+        emojis = [self.index_match(word) for word, _ in entries]
+        searched = [i for i, emoji_char in enumerate(emojis) if emoji_char is None]
+        if not searched:
+            return emojis
+        queries = [definition_query(*entries[i]) for i in searched]
+        query_embeddings = self.model.encode(queries, batch_size=batch_size, convert_to_numpy=True)
+        hits = util.semantic_search(query_embeddings, self.emoji_embeddings, top_k=1)
+        for i, query_embedding, query_hits in zip(searched, query_embeddings, hits):
+            word = entries[i][0]
+            best_idx, score = query_hits[0]["corpus_id"], query_hits[0]["score"]
+            candidates = emoji_tokens.get(word.lower().strip(), [])
+            if candidates:
+                indices = [self.emoji_indices[char] for char in candidates]
+                rows = np.asarray(self.emoji_embeddings[indices])
+                scores = rows @ query_embedding / (np.linalg.norm(rows, axis=1) * np.linalg.norm(query_embedding))
+                best = int(scores.argmax())
+                if scores[best] >= SCORE_THRESHOLD:
+                    best_idx, score = indices[best], float(scores[best])
+            if verbose:
+                print(f"Emoji Search: '{word}' -> {self.emoji_list[best_idx]} ({self.emoji_descriptions[best_idx]}) | Score: {score:.4f}")
+                if score < SCORE_THRESHOLD:
+                    print(f"Score too low (< {SCORE_THRESHOLD}), skipping emoji.")
+            emojis[i] = self.emoji_list[best_idx] if score >= SCORE_THRESHOLD else None
+        return emojis
+
+    def get_emoji_for_definition(self, word: str, definition: str, wait: bool = True) -> str | None:
+        """The emoji to show with word, or None. Without wait, None while the model is still loading
+        (loading it in the background), so the caller can ask again once it is ready."""
+        word_emojis = self._load_word_emojis()
+        if word_emojis is not None and word.upper() in word_emojis:
+            return word_emojis[word.upper()]
+
+        key = (word, definition)
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+
+        emoji_char = self.index_match(word)
+        if emoji_char is None:
+            if not wait and not self.ready:
+                self.warm_up()
+                return None
+            emoji_char = self.match_definitions([(word, definition)], verbose=True)[0]
+
+        self.results[key] = emoji_char
+        if len(self.results) > RESULT_CACHE_SIZE:
+            self.results.popitem(last=False)
+        return emoji_char
+
+    def index_match(self, word: str) -> str | None:
+        """The emoji named word, or else the only emoji with word as one of the words of its name"""
+        emoji_names, emoji_tokens = self._load_emoji_data()
+
         # Normalize word
         norm_word = word.lower().strip()
-        
-        # Simple heuristic: if word is in emoji name
-        for char, name in zip(self.emoji_list, self.emoji_descriptions):
-            if norm_word == name.lower():
-                return char
-            # Check for "word " or " word" to avoid partial matches like "tax" in "taxi"
-            # But "taxi" in "oncoming taxi" is good.
-            if f" {norm_word} " in f" {name.lower()} ":
-                 # We prefer exact match, but this is a good candidate. 
-                 # Let's collect candidates? No, keep it simple for now.
-                 pass
-
-        # Combine word and definition for better context
-        query = f"emoji of {word}: {definition}"
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-        
-        # Find closest match
-        hits = util.semantic_search(query_embedding, self.emoji_embeddings, top_k=1)
-        
-        if hits and hits[0]:
-            score = hits[0][0]['score']
-            best_idx = hits[0][0]['corpus_id']
-            emoji_char = self.emoji_list[best_idx]
-            description = self.emoji_descriptions[best_idx]
-            
-            print(f"Emoji Search: '{word}' -> {emoji_char} ({description}) | Score: {score:.4f}")
-            
-            if score >= 0.39:
-                return emoji_char
-            else:
-                print(f"Score too low (< 0.39), skipping emoji.")
-                return None
-        
-        return None # Fallback
+        emoji_char = emoji_names.get(norm_word)
+        if emoji_char is None:
+            candidates = emoji_tokens.get(norm_word, [])
+            if len(candidates) == 1:
+                emoji_char = candidates[0]
+        return emoji_char
 
     def generate_emoji_image(self, emoji_char: str, size: int = 512) -> str:
         """
@@ -93,8 +259,10 @@ class EmojiManager:
         Returns cached path if it already exists.
         Default size increased to 512 for better quality at large scales.
         """
+        from PIL import Image, ImageDraw, ImageFont
+
         # Hex encode emoji for filename to avoid filesystem issues
-        filename = "-".join(f"{ord(c):x}" for c in emoji_char) + f"_s{size}.png"
+        filename = emoji_codepoints(emoji_char) + f"_s{size}.png"
         
         filepath = CACHE_DIR / filename
         
@@ -184,6 +352,88 @@ class EmojiManager:
             print(f"Error generating emoji image: {e}")
             return None
 
+def emoji_codepoints(emoji_char: str) -> str:
+    """Hex code points joined by "-", as in the generated image file names"""
+    return "-".join(f"{ord(c):x}" for c in emoji_char)
+
+
+def emoji_from_codepoints(codepoints: str) -> str:
+    return "".join(chr(int(c, 16)) for c in codepoints.split("-"))
+
+
+def definition_query(word: str, definition: str) -> str:
+    return f"emoji of {word}: {definition}"
+
+
+def read_word_emojis(path=WORD_EMOJIS_PATH) -> dict[str, str | None]:
+    word_emojis: dict[str, str | None] = {}
+    with open(path) as file:
+        for line in file:
+            fields = line.split()
+            if fields:
+                word_emojis[fields[0]] = emoji_from_codepoints(fields[1]) if len(fields) > 1 else None
+    return word_emojis
+
+
+def write_word_emojis(word_emojis: dict[str, str | None], path=WORD_EMOJIS_PATH) -> None:
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, "w") as file:
+        for word, emoji_char in word_emojis.items():
+            if emoji_char is None:
+                file.write(f"{word}\n")
+            else:
+                file.write(f"{word} {emoji_codepoints(emoji_char)}\n")
+    os.replace(tmp_path, path)
+
+
+def write_emoji_atlas(size: int = 512, tile_size: int = ATLAS_TILE_SIZE, path=ATLAS_PATH,
+                      index_path=ATLAS_INDEX_PATH) -> int:
+    """Pack every emoji image generated at size into one image of tile_size tiles, ATLAS_COLUMNS per row
+
+    The index file has the tile size and column count on its first line, then the code points of
+    the emoji in each tile, in order. Returns the number of emojis packed.
+    """
+    from PIL import Image
+
+    suffix = f"_s{size}.png"
+    png_paths = sorted(png_path for png_path in CACHE_DIR.iterdir() if png_path.name.endswith(suffix))
+    rows = max(1, -(-len(png_paths) // ATLAS_COLUMNS))
+    atlas = Image.new("RGBA", (ATLAS_COLUMNS * tile_size, rows * tile_size), (0, 0, 0, 0))
+    for i, png_path in enumerate(png_paths):
+        with Image.open(png_path) as image:
+            tile = image.convert("RGBA").resize((tile_size, tile_size), resample=Image.Resampling.LANCZOS)
+        row, column = divmod(i, ATLAS_COLUMNS)
+        atlas.paste(tile, (column * tile_size, row * tile_size))
+
+    tmp_path = str(path) + ".tmp"
+    atlas.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+    tmp_path = str(index_path) + ".tmp"
+    with open(tmp_path, "w") as index_file:
+        index_file.write(f"{tile_size} {ATLAS_COLUMNS}\n")
+        for png_path in png_paths:
+            index_file.write(png_path.name[:-len(suffix)] + "\n")
+    os.replace(tmp_path, index_path)
+    return len(png_paths)
+
+
+def read_emoji_atlas(path=ATLAS_PATH, index_path=ATLAS_INDEX_PATH) -> "tuple[int, dict[str, Image.Image]]":
+    """The atlas's tile size and each emoji's image, cropped from the atlas, which is decoded once"""
+    from PIL import Image
+
+    with open(index_path) as index_file:
+        tile_size, columns = map(int, index_file.readline().split())
+        codepoints = [line.strip() for line in index_file if line.strip()]
+    with Image.open(path) as atlas:
+        atlas.load()
+        images = {}
+        for i, emoji_hex in enumerate(codepoints):
+            row, column = divmod(i, columns)
+            x, y = column * tile_size, row * tile_size
+            images[emoji_from_codepoints(emoji_hex)] = atlas.crop((x, y, x + tile_size, y + tile_size))
+    return tile_size, images
+
+
 # Singleton instance
 emoji_manager = EmojiManager()
 
@@ -0,0 +1,229 @@
+# Endgame search, for when the bag is empty and both racks are known.
+# Negamax with alpha-beta pruning over every scored play plus a pass, deepened one ply at a time
+# until the whole game tree has been searched or the time limit runs out. Plays are tried best
+# score first, after the best play the transposition table remembers for the position. Positions
+# are hashed Zobrist-style from the tiles on the board, the blanks among them, both racks, the side
+# to move and the number of passes in a row, and updated as plays are made and taken back.
+
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+
+from board import Board, CellCoord, Letter
+from lexicon import Lexicon
+from rules import TILE_SCORE, Play, new_tiles
+from solver import BLANK, ORD_A, SolverState, rack_counts
+
+ENDGAME_TIME_LIMIT_MS = 1000
+INFINITY = 1 << 30
+
+_SQUARES = 15 * 15
+_random = random.Random(0)
+_TILE_KEYS = [[_random.getrandbits(64) for _ in range(BLANK)] for _ in range(_SQUARES)]
+_BLANK_KEYS = [_random.getrandbits(64) for _ in range(_SQUARES)]
+# _RACK_KEYS[player][slot][n] stands for player holding n tiles of kind slot
+_RACK_KEYS = [[[_random.getrandbits(64) for _ in range(8)] for _ in range(BLANK + 1)] for _ in range(2)]
+_SIDE_KEY = _random.getrandbits(64)
+_PASS_KEYS = [0, _random.getrandbits(64)]
+
+
+class Bound(Enum):
+    EXACT = 1
+    LOWER = 2  # the search failed high, the value is at least this
+    UPPER = 3  # the search failed low, the value is at most this
+
+
+@dataclass
+class TableEntry:
+    depth: int
+    value: int
+    bound: Bound
+    best: Play | None  # None for a pass
+    complete: bool  # no line was cut off by the depth limit
+
+
+@dataclass
+class EndgameResult:
+    play: Play | None  # None when passing is best
+    value: int  # final spread change for the player to move, counting the going-out bonus
+    depth: int  # plies searched by the last completed iteration
+    complete: bool  # the search reached the end of the game on every line, so value is exact
+    nodes: int
+
+
+class _SearchTimeoutError(Exception):
+    """Unwinds the search when the time limit runs out"""
+
+
+class EndgameSolver:
+    def __init__(self, lexicon: Lexicon, board: Board, racks: tuple[list[Letter], list[Letter]],
+                 blank_letters: set[CellCoord]) -> None:
+        """racks[0] is the player to move; board is changed during the search and restored afterwards"""
+        self.lexicon = lexicon
+        self.board = board
+        self.counts = [rack_counts(racks[0]), rack_counts(racks[1])]
+        self.blank_letters = set(blank_letters)  # display coordinates, as in Play.blanks
+        self.side = 0
+        self.table: dict[int, TableEntry] = dict()
+        self.moves: dict[int, list[Play]] = dict()  # generated plays, best first, per position
+        self.nodes = 0
+        self.deadline = 0.0
+        self.cut_short = False  # some line stopped at the depth limit before the end of the game
+        self.key = 0
+        for row, col in board.all_positions():
+            if board.is_filled((row, col)):
+                self.key ^= self._tile_key(row, col, board.tile((row, col)))
+        for player in range(2):
+            for slot, count in enumerate(self.counts[player]):
+                self.key ^= _RACK_KEYS[player][slot][count]
+
+    def _tile_key(self, row: int, col: int, letter: Letter) -> int:
+        square = row * 15 + col
+        key = _TILE_KEYS[square][ord(letter) - ORD_A]
+        return key ^ _BLANK_KEYS[square] if (14 - row, col) in self.blank_letters else key
+
+    def _rack_letters(self, player: int) -> list[Letter]:
+        counts = self.counts[player]
+        return [" " if slot == BLANK else chr(ORD_A + slot) for slot in range(BLANK + 1) for _ in range(counts[slot])]
+
+    def _rack_value(self, player: int) -> int:
+        return sum(TILE_SCORE[letter] for letter in self._rack_letters(player))
+
+    def _plays(self) -> list[Play]:
+        plays = self.moves.get(self.key)
+        if plays is None:
+            solver = SolverState(self.lexicon.dawg, self.board, self._rack_letters(self.side))
+            plays = sorted(solver.find_all_plays(self.blank_letters), key=lambda play: -play.score)
+            self.moves[self.key] = plays
+        return plays
+
+    def _set_count(self, player: int, slot: int, count: int) -> None:
+        counts = self.counts[player]
+        self.key ^= _RACK_KEYS[player][slot][counts[slot]] ^ _RACK_KEYS[player][slot][count]
+        counts[slot] = count
+
+    def _make(self, play: Play) -> list[tuple[CellCoord, int]]:
+        """Put play on the board and take its tiles off the rack of the side to move"""
+        placed = []
+        for (row, col), letter in new_tiles(self.board, play):
+            is_blank = (14 - row, col) in play.blanks
+            slot = BLANK if is_blank else ord(letter) - ORD_A
+            self.board.set_tile((row, col), letter)
+            if is_blank:
+                self.blank_letters.add((14 - row, col))
+            self.key ^= self._tile_key(row, col, letter)
+            self._set_count(self.side, slot, self.counts[self.side][slot] - 1)
+            placed.append(((row, col), slot))
+        return placed
+
+    def _unmake(self, placed: list[tuple[CellCoord, int]]) -> None:
+        for (row, col), slot in placed:
+            self.key ^= self._tile_key(row, col, self.board.tile((row, col)))
+            self.board.set_tile((row, col), ".")
+            self.blank_letters.discard((14 - row, col))
+            self._set_count(self.side, slot, self.counts[self.side][slot] + 1)
+
+    def _switch_side(self) -> None:
+        self.side = 1 - self.side
+        self.key ^= _SIDE_KEY
+
+    def search(self, depth: int, alpha: int, beta: int, passes: int) -> int:
+        """Best spread change the side to move can force from here, looking depth plies ahead"""
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise _SearchTimeoutError()
+        if depth == 0:
+            self.cut_short = True
+            return 0
+        key = self.key ^ _PASS_KEYS[passes]
+        entry = self.table.get(key)
+        best_first = None
+        if entry is not None:
+            best_first = entry.best
+            if entry.depth >= depth:
+                if not entry.complete:
+                    self.cut_short = True
+                if entry.bound == Bound.EXACT:
+                    return entry.value
+                if entry.bound == Bound.LOWER:
+                    alpha = max(alpha, entry.value)
+                else:
+                    beta = min(beta, entry.value)
+                if alpha >= beta:
+                    return entry.value
+
+        candidates: list[Play | None] = list(self._plays())
+        if best_first is not None and best_first in candidates:
+            candidates.remove(best_first)
+            candidates.insert(0, best_first)
+        candidates.append(None)  # passing is always allowed
+
+        outer_cut_short, self.cut_short = self.cut_short, False
+        original_alpha = alpha
+        best_value, best_play = -INFINITY, None
+        for play in candidates:
+            if play is None:
+                value = 0 if passes == 1 else -self._reply(depth, alpha, beta, 1)  # two passes end the game
+            else:
+                placed = self._make(play)
+                try:
+                    if not any(self.counts[self.side]):
+                        # Going out: same end-of-game bonus as the game, twice the tiles left on the other rack
+                        value = play.score + 2 * self._rack_value(1 - self.side)
+                    else:
+                        value = play.score - self._reply(depth, alpha - play.score, beta - play.score, 0)
+                finally:
+                    self._unmake(placed)
+            if value > best_value:
+                best_value, best_play = value, play
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            bound = Bound.UPPER
+        elif best_value >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        complete = not self.cut_short
+        # A complete result holds however deep a later search wants to look
+        self.table[key] = TableEntry(INFINITY if complete else depth, best_value, bound, best_play, complete)
+        self.cut_short = outer_cut_short or self.cut_short
+        return best_value
+
+    def _reply(self, depth: int, alpha: int, beta: int, passes: int) -> int:
+        """Value of the position after a move for the opponent, searched with the mover's window negated"""
+        self._switch_side()
+        try:
+            return self.search(depth - 1, -beta, -alpha, passes)
+        finally:
+            self._switch_side()
+
+    def solve(self, time_limit_ms: int = ENDGAME_TIME_LIMIT_MS, max_depth: int = 32) -> EndgameResult:
+        """Deepen one ply at a time until the result is exact, max_depth is reached or time runs out
+
+        When the first iteration does not finish in time the best scoring play is returned.
+        """
+        self.deadline = time.perf_counter() + time_limit_ms / 1000
+        plays = self._plays()
+        result = EndgameResult(plays[0] if plays else None, 0, 0, False, 0)
+        for depth in range(1, max_depth + 1):
+            self.cut_short = False
+            try:
+                value = self.search(depth, -INFINITY, INFINITY, 0)
+            except _SearchTimeoutError:
+                break
+            entry = self.table[self.key]
+            result = EndgameResult(entry.best, value, depth, not self.cut_short, self.nodes)
+            if result.complete:
+                break
+        result.nodes = self.nodes
+        return result
+
+
+def solve_endgame(lexicon: Lexicon, board: Board, racks: tuple[list[Letter], list[Letter]],
+                  blank_letters: set[CellCoord], time_limit_ms: int = ENDGAME_TIME_LIMIT_MS) -> EndgameResult:
+    """Best play for racks[0] when racks[1] is the opponent's rack and the bag is empty"""
+    return EndgameSolver(lexicon, board.copy(), racks, blank_letters).solve(time_limit_ms)
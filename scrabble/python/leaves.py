@@ -0,0 +1,143 @@
+# Leave values: what the tiles kept on the rack after a play are worth, for every leave of 0-6 tiles.
+# A leave is ranked with the combinatorial number system for multisets, a minimal perfect hash of
+# the sorted leave over all multisets of up to 6 of the 27 tile kinds, so looking one up is a few
+# additions and one read from a flat array. Values are stored as int16 tenths of a point in a
+# binary file that is mmap'ed on load, in the same spirit as the compiled lexicon.
+
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from math import comb
+
+from board import Letter
+from rules import TILE_BAG, Play
+from solver import BLANK, ORD_A, rack_counts
+
+LEAVES_PATH = "../dictionary/leaves.bin"
+
+MAGIC = b"HOOKLEAV"
+FORMAT_VERSION = 1
+BYTE_ORDER_MARK = 0x01020304
+# magic, version, byte order mark, entry count
+HEADER = struct.Struct("=8sIII")
+
+KINDS = BLANK + 1
+MAX_LEAVE = 6
+SCALE = 10  # stored values are tenths of a point
+
+# _SIZE_OFFSET[k] is the number of leaves with fewer than k tiles, the first rank of a k tile leave
+_SIZE_OFFSET = [sum(comb(KINDS + size - 1, size) for size in range(k)) for k in range(MAX_LEAVE + 2)]
+TABLE_SIZE = _SIZE_OFFSET[MAX_LEAVE + 1]
+# _RANK_STEP[slot][i] is what the i-th tile of a sorted leave adds to its rank when it is of kind slot
+_RANK_STEP = [[0] + [comb(slot + i - 1, i) for i in range(1, MAX_LEAVE + 1)] for slot in range(KINDS)]
+
+
+def leave_rank(counts: Sequence[int]) -> int:
+    """Index of a leave, given as a count per tile kind (see solver.rack_counts), in the table"""
+    rank, size = 0, 0
+    for slot in range(KINDS):
+        for _ in range(counts[slot]):
+            size += 1
+            rank += _RANK_STEP[slot][size]
+    return _SIZE_OFFSET[size] + rank
+
+
+class LeaveTable:
+    def __init__(self, values: Sequence[int]) -> None:
+        if len(values) != TABLE_SIZE:
+            raise ValueError(f"leave table has {len(values)} entries, expected {TABLE_SIZE}")
+        self.values = values
+
+    def value(self, counts: Sequence[int]) -> float:
+        return self.values[leave_rank(counts)] / SCALE
+
+def equity(play: Play) -> float:
+    """Score plus the value of the leave, for plays generated with a leave table"""
+    return play.score + play.leave
+
+
+# Hand-tuned weights for the built-in table, in points. A table fitted from real games can be
+# written with write_leave_table and loaded in its place.
+TILE_VALUES = {
+    "A": 0.5, "B": -2.0, "C": 0.5, "D": 0.0, "E": 3.0, "F": -2.0, "G": -2.0, "H": 1.0, "I": -0.5,
+    "J": -1.5, "K": -1.5, "L": 0.0, "M": 0.5, "N": 0.5, "O": -1.0, "P": -0.5, "Q": -7.0, "R": 1.5,
+    "S": 8.0, "T": 0.5, "U": -4.0, "V": -6.0, "W": -4.0, "X": 3.5, "Y": -0.5, "Z": 3.0, " ": 25.0,
+}
+DUPLICATE_PENALTY = 4.0  # for each copy of a letter after the first
+CHEAP_DUPLICATE_PENALTY = 1.5  # the same for S and blanks
+QU_BONUS = 5.0
+VOWEL_IMBALANCE_PENALTY = 2.5  # per vowel away from 40% of the non-blank tiles
+VOWELS = "AEIOU"
+
+
+def _slot_letter(slot: int) -> Letter:
+    return " " if slot == BLANK else chr(ORD_A + slot)
+
+
+def build_leave_table() -> LeaveTable:
+    """The built-in table, valuing every leave that can be drawn from TILE_BAG with TILE_VALUES"""
+    values = array("h", bytes(2 * TABLE_SIZE))
+    available = rack_counts(TILE_BAG)
+    counts = [0] * KINDS
+    letters = [_slot_letter(slot) for slot in range(KINDS)]
+    tile_values = [TILE_VALUES[letter] for letter in letters]
+    duplicate_penalties = [
+        CHEAP_DUPLICATE_PENALTY if letter in "S " else DUPLICATE_PENALTY for letter in letters
+    ]
+    is_vowel = [letter in VOWELS for letter in letters]
+    q, u = ord("Q") - ORD_A, ord("U") - ORD_A
+
+    # Leaves are visited with their tiles in sorted order, so rank and value are built up tile by tile
+    def visit(first_slot: int, size: int, rank: int, value: float, vowels: int) -> None:
+        total = value
+        non_blank = size - counts[BLANK]
+        total -= VOWEL_IMBALANCE_PENALTY * abs(vowels - 0.4 * non_blank)
+        if counts[q] and counts[u]:
+            total += QU_BONUS
+        values[_SIZE_OFFSET[size] + rank] = round(total * SCALE)
+        if size == MAX_LEAVE:
+            return
+        for slot in range(first_slot, KINDS):
+            if counts[slot] == available[slot]:
+                continue
+            added = tile_values[slot] - (duplicate_penalties[slot] if counts[slot] else 0.0)
+            counts[slot] += 1
+            visit(slot, size + 1, rank + _RANK_STEP[slot][size + 1], value + added, vowels + is_vowel[slot])
+            counts[slot] -= 1
+
+    visit(0, 0, 0, 0.0, 0)
+    return LeaveTable(values)
+
+
+def write_leave_table(table: LeaveTable, path: str = LEAVES_PATH) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, len(table.values)))
+        array("h", table.values).tofile(file)
+    os.replace(tmp_path, path)
+
+
+def load_leave_table(path: str = LEAVES_PATH) -> LeaveTable:
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, byte_order_mark, count = HEADER.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a leave table")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+    if byte_order_mark != BYTE_ORDER_MARK:
+        raise ValueError(f"{path} was written on a machine with a different byte order")
+    return LeaveTable(memoryview(mapping)[HEADER.size:HEADER.size + 2 * count].cast("h"))
+
+
+def leave_table() -> LeaveTable:
+    """The leave table file if there is one, otherwise the built-in table"""
+    if os.path.exists(LEAVES_PATH):
+        try:
+            return load_leave_table(LEAVES_PATH)
+        except ValueError as e:
+            print(f"Not using leave table: {e}")
+    print(f"Building leave table (run compile_leaves.py to write {LEAVES_PATH})")
+    return build_leave_table()
@@ -0,0 +1,193 @@
+# Compiled lexicon: DAWG and a definitions index in one versioned binary file.
+# The file is mmap'ed read-only and every array is a memoryview into the mapping, so loading
+# is O(1) and processes that load the same file share its pages.
+
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+from dawg import Dawg
+
+WORDS_PATH = "../dictionary/nwl_2020.txt"
+LEXICON_PATH = "../dictionary/nwl_2020.lex"
+
+MAGIC = b"HOOKLEX\0"
+FORMAT_VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+
+# magic, version, byte order mark, section count
+HEADER = struct.Struct("=8sIII")
+# name, array typecode, offset, item count
+SECTION = struct.Struct("=8s4sQQ")
+ALIGNMENT = 8
+# A definition that starts with "<WORD=pos>" or "{WORD=pos}" refers to WORD's definition, which is
+# appended after " || ", following at most this many references (the chains can loop)
+MAX_REDIRECTS = 10
+
+
+class Definitions:
+    """Sorted words and their definitions, looked up by binary search over offset tables
+
+    Redirects are resolved when the index is built, so a lookup returns the whole chain.
+    """
+
+    def __init__(self, keys: Sequence[int], key_offsets: Sequence[int],
+                 text: Sequence[int], text_offsets: Sequence[int]) -> None:
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.text = text
+        self.text_offsets = text_offsets
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[tuple[str, str]]) -> "Definitions":
+        definitions = dict(entries)
+        keys, text = bytearray(), bytearray()
+        key_offsets, text_offsets = array("I", [0]), array("I", [0])
+        for word in sorted(definitions):
+            keys += word.encode()
+            text += resolve_redirects(definitions, word).encode()
+            key_offsets.append(len(keys))
+            text_offsets.append(len(text))
+        return cls(bytes(keys), key_offsets, bytes(text), text_offsets)
+
+    def __len__(self) -> int:
+        return len(self.key_offsets) - 1
+
+    def key(self, index: int) -> str:
+        return self._key_bytes(index).decode()
+
+    def _key_bytes(self, index: int) -> bytes:
+        return bytes(self.keys[self.key_offsets[index]:self.key_offsets[index + 1]])
+
+    def index(self, word: str) -> int:
+        # Keys are compared as bytes, which sort the same as the ASCII words they encode
+        encoded = word.encode()
+        i = bisect_left(range(len(self)), encoded, key=self._key_bytes)
+        if i < len(self) and self._key_bytes(i) == encoded:
+            return i
+        return -1
+
+    def __contains__(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+    def __getitem__(self, word: str) -> str:
+        i = self.index(word)
+        if i < 0:
+            raise KeyError(word)
+        return bytes(self.text[self.text_offsets[i]:self.text_offsets[i + 1]]).decode()
+
+    def get(self, word: str, default: str | None = None) -> str | None:
+        return self[word] if word in self else default
+
+
+def resolve_redirects(definitions: dict[str, str], word: str) -> str:
+    """word's definition followed by those it redirects to, as the game displays it"""
+    definition = definitions[word]
+    chain = [definition]
+    while definition.startswith(("<", "{")) and len(chain) <= MAX_REDIRECTS:
+        target = definition.split("=")[0][1:].upper()
+        if target not in definitions:
+            break
+        definition = definitions[target]
+        chain.append(definition)
+    return " || ".join(chain)
+
+
+@dataclass
+class Lexicon:
+    dawg: Dawg
+    definitions: Definitions
+    path: str | None = None  # the compiled file this was loaded from, if any
+
+
+def read_word_list(path: str = WORDS_PATH) -> list[tuple[str, str]]:
+    entries = []
+    with open(path) as file:
+        for line in file:
+            words = line.strip().split()
+            if words:
+                entries.append((words[0], " ".join(words[1:])))
+    return entries
+
+
+def build_lexicon(entries: list[tuple[str, str]]) -> Lexicon:
+    return Lexicon(Dawg.from_words([word for word, _ in entries]), Definitions.from_entries(entries))
+
+
+def _sections(lexicon: Lexicon) -> list[tuple[str, str, Sequence[int]]]:
+    dawg, definitions = lexicon.dawg, lexicon.definitions
+    return [
+        ("dfirst", "i", dawg.first_edge),
+        ("dletter", "B", dawg.edge_letters),
+        ("dtarget", "i", dawg.edge_targets),
+        ("dterm", "B", dawg.terminal),
+        ("keys", "B", definitions.keys),
+        ("keyoff", "I", definitions.key_offsets),
+        ("text", "B", definitions.text),
+        ("textoff", "I", definitions.text_offsets),
+    ]
+
+
+def write_lexicon(lexicon: Lexicon, path: str = LEXICON_PATH) -> None:
+    sections = [(name, code, array(code, values)) for name, code, values in _sections(lexicon)]
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, code, values in sections:
+        offset += -offset % ALIGNMENT
+        table.append(SECTION.pack(name.encode(), code.encode(), offset, len(values)))
+        offset += len(values) * values.itemsize
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER_MARK, len(sections)))
+        file.write(b"".join(table))
+        for _, _, values in sections:
+            file.write(b"\0" * (-file.tell() % ALIGNMENT))
+            values.tofile(file)
+    os.replace(tmp_path, path)
+
+
+def load_lexicon(path: str = LEXICON_PATH) -> Lexicon:
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, byte_order_mark, count = HEADER.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a compiled lexicon")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+    if byte_order_mark != BYTE_ORDER_MARK:
+        raise ValueError(f"{path} was compiled on a machine with a different byte order")
+
+    buffer = memoryview(mapping)
+    views = dict()
+    for i in range(count):
+        name, code, offset, length = SECTION.unpack_from(mapping, HEADER.size + i * SECTION.size)
+        code = code.rstrip(b"\0").decode()
+        size = length * struct.calcsize(code)
+        views[name.rstrip(b"\0").decode()] = buffer[offset:offset + size].cast(code)
+
+    return Lexicon(
+        Dawg(views["dfirst"], views["dletter"], views["dtarget"], views["dterm"]),
+        Definitions(views["keys"], views["keyoff"], views["text"], views["textoff"]),
+        path,
+    )
+
+
+def compile_lexicon(words_path: str = WORDS_PATH, path: str = LEXICON_PATH) -> Lexicon:
+    lexicon = build_lexicon(read_word_list(words_path))
+    write_lexicon(lexicon, path)
+    return lexicon
+
+
+def nwl_2020() -> Lexicon:
+    """The compiled lexicon if it is up to date, otherwise one built from the word list"""
+    if os.path.exists(LEXICON_PATH) and os.path.getmtime(LEXICON_PATH) >= os.path.getmtime(WORDS_PATH):
+        try:
+            return load_lexicon(LEXICON_PATH)
+        except ValueError as e:
+            print(f"Not using compiled lexicon: {e}")
+    print(f"Building lexicon from {WORDS_PATH} (run compile_lexicon.py to speed up startup)")
+    return build_lexicon(read_word_list(WORDS_PATH))
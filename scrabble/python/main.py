@@ -9,18 +9,29 @@ import random
 import sys
 import textwrap
 from collections import defaultdict
-from dataclasses import dataclass
 from enum import Enum
 
 import arcade
 from colorama import Fore, Style, init
 from numpy import sign
-from result import Err, Ok
+from result import Err
 
 from board import Board, CellCoord, Direction, Letter, Position
-from emoji_manager import emoji_manager
+from emoji_manager import ATLAS_INDEX_PATH, ATLAS_PATH, emoji_manager, read_emoji_atlas
+from lexicon import nwl_2020
+from parallel import SolverPool
+from rules import (
+    BOARD,
+    TILE_BAG,
+    TILE_SCORE,
+    Play,
+    Tl,
+    place_play,
+    refill_rack,
+    word_score,
+)
 from solver import CellCoord, SolverState
-from trie import nwl_2020
+from solver_service import SolverService
 
 Color = tuple[int, int, int]
 
@@ -51,333 +62,6 @@ FONT_SIZE = 30
 HORIZ_TEXT_OFFSET = 13
 VERT_TEXT_OFFSET = 15
 
-
-class Tl(Enum):
-    NO = 1
-    DL = 2
-    DW = 3
-    TL = 4
-    TW = 5
-
-
-BOARD = [
-    [
-        Tl.TW,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.TW,
-    ],
-    [
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.TW,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.TW,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-    ],
-    [
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-    ],
-    [
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DW,
-        Tl.NO,
-    ],
-    [
-        Tl.TW,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.TW,
-        Tl.NO,
-        Tl.NO,
-        Tl.NO,
-        Tl.DL,
-        Tl.NO,
-        Tl.NO,
-        Tl.TW,
-    ],
-]
-
-TILE_SCORE = {
-    "A": 1,
-    "B": 3,
-    "C": 3,
-    "D": 2,
-    "E": 1,
-    "F": 4,
-    "G": 2,
-    "H": 4,
-    "I": 1,
-    "J": 8,
-    "K": 5,
-    "L": 1,
-    "M": 3,
-    "N": 1,
-    "O": 1,
-    "P": 3,
-    "Q": 10,
-    "R": 1,
-    "S": 1,
-    "T": 1,
-    "U": 1,
-    "V": 4,
-    "W": 4,
-    "X": 8,
-    "Y": 4,
-    "Z": 10,
-    " ": 0,
-}
-
-TILE_BAG = (
-    ["A"] * 9
-    + ["B"] * 2
-    + ["C"] * 2
-    + ["D"] * 4
-    + ["E"] * 12
-    + ["F"] * 2
-    + ["G"] * 3
-    + ["H"] * 2
-    + ["I"] * 9
-    + ["J"] * 1
-    + ["K"] * 1
-    + ["L"] * 4
-    + ["M"] * 2
-    + ["N"] * 6
-    + ["O"] * 8
-    + ["P"] * 2
-    + ["Q"] * 1
-    + ["R"] * 6
-    + ["S"] * 4
-    + ["T"] * 6
-    + ["U"] * 4
-    + ["V"] * 2
-    + ["W"] * 2
-    + ["X"] * 1
-    + ["Y"] * 2
-    + ["Z"] * 1
-    + [" "] * 2
-)
-
 LR_ARROW_KEYS = [arcade.key.LEFT, arcade.key.RIGHT]
 UD_ARROW_KEYS = [arcade.key.UP, arcade.key.DOWN]
 ARROW_KEYS = LR_ARROW_KEYS + UD_ARROW_KEYS
@@ -399,6 +83,16 @@ class LogType(Enum):
 
 DEBUG = True
 
+# Number of processes to generate moves in, 0 to generate them on the game thread
+SOLVER_WORKERS = 0
+# Milliseconds the computer may think before playing the best play found so far, None to always search fully
+SOLVER_DEADLINE_MS = None
+# Load the emoji model in the background once the window is up, instead of on the first word shown.
+# Only done without the word table from compile_emojis.py, which makes the model unnecessary for most words
+EMOJI_WARM_UP = False
+# Load the emoji atlas written by compile_emojis.py --atlas at startup, so emojis in it are never read from disk
+EMOJI_ATLAS = False
+
 
 def log(msg: str, type: LogType):
     if DEBUG:
@@ -422,11 +116,6 @@ class Hooks(Enum):
     ON_RACK = 2
 
 
-class Extension(Enum):
-    PREFIX = 1
-    SUFFIX = 2
-
-
 class Phase(Enum):
     PLAYERS_TURN = 1
     PAUSE_FOR_ANALYSIS = 2
@@ -438,15 +127,6 @@ class Phase(Enum):
     CONFIRM_PASS = 8
 
 
-@dataclass(frozen=True, order=True)
-class Play:
-    score: int
-    word: str
-    pos: Position
-    is_bingo: bool
-    blanks: set[CellCoord]
-
-
 class Cursor:
     x: int
     y: int
@@ -487,22 +167,6 @@ def word_wrap_split(text: str, line_length: int):
     return wrapper.wrap(text)
 
 
-def letter_multiplier(row: int, col: int) -> int:
-    if BOARD[row][col] == Tl.DL:
-        return 2
-    if BOARD[row][col] == Tl.TL:
-        return 3
-    return 1
-
-
-def word_multiplier(row: int, col: int) -> int:
-    if BOARD[row][col] == Tl.DW:
-        return 2
-    if BOARD[row][col] == Tl.TW:
-        return 3
-    return 1
-
-
 def tile_color(pos: CellCoord) -> Color:
     row, col = pos
     if BOARD[row][col] == Tl.DL:
@@ -516,139 +180,6 @@ def tile_color(pos: CellCoord) -> Color:
     return COLOR_NORMAL
 
 
-def deltas(dir) -> tuple[int, int]:
-    row_delta = 1 if dir == Direction.DOWN else 0
-    col_delta = 0 if dir == Direction.DOWN else 1
-    return (row_delta, col_delta)
-
-
-def extension_tiles(ext, board, dir, row, col, blank_poss):
-    delta_factor = -1 if ext == Extension.PREFIX else 1
-    row_delta, col_delta = tuple(delta_factor * i for i in list(deltas(dir)))
-    next_row, next_col, tiles, score = row, col, "", 0
-    while True:
-        next_row += row_delta
-        next_col += col_delta
-        pos = (next_row, next_col)
-        if board.is_filled(pos):
-            tiles += board.tile(pos)
-            if (14 - next_row, next_col) not in blank_poss:
-                score += TILE_SCORE.get(board.tile(pos))
-        else:
-            break
-    return (tiles[::delta_factor], score)
-
-
-def prefix_tiles(board, dir, row, col, blank_poss):
-    return extension_tiles(Extension.PREFIX, board, dir, row, col, blank_poss)
-
-
-def suffix_tiles(board, dir, row, col, blank_poss):
-    return extension_tiles(Extension.SUFFIX, board, dir, row, col, blank_poss)
-
-
-def word_score(board, dictionary, letters, pos, first_call, blank_poss):
-    dir, row, col = pos.dir, 14 - pos.row, pos.col
-    if board.is_filled((row, col)):
-        return Err("cannot start word on existing tile")
-    rest_of_row = (
-        board._tiles[row][col:]
-        if dir == Direction.ACROSS
-        else list(zip(*board._tiles))[col][row:]
-    )
-    if len([1 for c in rest_of_row if c == "."]) < len(letters):
-        return Err("outside of board")
-
-    word_played, score = prefix_tiles(board, dir, row, col, blank_poss)
-    has_prefix = len(word_played) > 0
-    word_mult = 1
-    row_delta, col_delta = deltas(dir)
-    crosses = len(word_played) > 0
-    valid_start = False
-    blanks = set()
-    letters_played = 0
-
-    perpandicular_words = []
-
-    for letter in letters:
-        while board.is_filled((row, col)):
-            word_played = word_played + board.tile((row, col))
-            if (14 - row, col) not in blank_poss:
-                score += TILE_SCORE.get(board.tile((row, col)))
-            row += row_delta
-            col += col_delta
-            crosses = True
-        letters_played += 1
-        word_played += letter
-        word_mult *= word_multiplier(row, col)
-        if (14 - row, col) not in blank_poss:
-            score += TILE_SCORE.get(letter) * letter_multiplier(row, col)
-        else:
-            blanks.add((14 - row, col))
-        if len(letters) == 1:
-            one_letter_score = TILE_SCORE.get(letter) * letter_multiplier(row, col)
-
-        # find perpendicular words that need to be scored
-        if dir == Direction.ACROSS:
-            if board.is_filled((row + 1, col)) or board.is_filled((row - 1, col)):
-                perpandicular_words.append((letter, (row, col)))
-        else:
-            if board.is_filled((row, col + 1)) or board.is_filled((row, col - 1)):
-                perpandicular_words.append((letter, (row, col)))
-        if row * col == 49:
-            valid_start = True
-        row += row_delta
-        col += col_delta
-
-    suffix, suffix_score = suffix_tiles(
-        board, dir, row - row_delta, col - col_delta, blank_poss
-    )
-    word_played += suffix
-    has_suffix = len(suffix) > 0
-
-    score += suffix_score
-
-    if not has_prefix and not has_suffix and len(letters) == 1:
-        score -= one_letter_score
-
-    score *= word_mult
-    score += 50 if len(letters) == 7 else 0
-
-    if (
-        not crosses
-        and len(suffix) == 0
-        and len(perpandicular_words) == 0
-        and first_call
-    ):
-        if board.is_first_turn():
-            if not valid_start:
-                return Err("first move must be through center tile")
-        else:
-            return Err("does not overlap with any other word")
-
-    if first_call:
-        opposite_dir = Direction.ACROSS if dir == Direction.DOWN else Direction.DOWN
-        for word, (r, c) in perpandicular_words:
-            new_pos = Position(opposite_dir, 14 - r, c)
-            potential_play = word_score(
-                board, dictionary, word, new_pos, False, blank_poss
-            )
-            if potential_play.is_ok():
-                play = potential_play.unwrap()
-                score += play.score
-                if len(word_played) == 1:
-                    word_played = play.word
-            else:
-                return potential_play
-
-    if not dictionary.is_word(word_played) and not (
-        len(word_played) == 1 and len(perpandicular_words)
-    ):
-        return Err(f"{word_played} not in dictionary")
-
-    return Ok(Play(score, word_played, pos, letters_played == 7, blanks))
-
-
 class MyGame(arcade.Window):
     """Main application class"""
 
@@ -686,16 +217,18 @@ class MyGame(arcade.Window):
         self.player_words_found = set()  # by rank
         self.player_scores_found = set()
         self.player_current_play = Err("no play yet")
+        # Last result of is_playable_and_score_and_word and what it was computed from
+        self.typed_play_key = None
+        self.typed_play = Err("no letters typed")
         self.pending_play = None
 
         self.hook_letters = defaultdict(set)
         self.display_hook_letters = Hooks.OFF
 
-        self.DEFINITIONS = dict()
-        with open("../dictionary/nwl_2020.txt") as f:
-            for line in f:
-                words = line.strip().split()
-                self.DEFINITIONS[words[0]] = " ".join(words[1:])
+        self.lexicon = nwl_2020()
+        solver_pool = SolverPool(self.lexicon, SOLVER_WORKERS) if SOLVER_WORKERS else None
+        self.solver_service = SolverService(self.lexicon, solver_pool, SOLVER_DEADLINE_MS)
+        self.DEFINITIONS = self.lexicon.definitions
 
         # this is a set of words that the computer can't play
         # it forces the computer to use words you don't know so
@@ -706,7 +239,7 @@ class MyGame(arcade.Window):
                 word = line.strip()
                 self.KNOW.add(word)
 
-        self.trie = nwl_2020()
+        self.trie = self.lexicon.dawg
 
         self.letters_typed = {}
         self.letters_to_highlight = set()
@@ -716,6 +249,21 @@ class MyGame(arcade.Window):
         self.just_bingoed = False
         self.definition = ""
         self.current_emoji_texture = None
+        # Word shown while the emoji model was still loading, to look up again once it is ready
+        self.emoji_pending_word = None
+        # The emoji model is still to be warmed up, on the first update
+        self.emoji_warm_up_pending = EMOJI_WARM_UP
+        # ENTER was pressed while the player's plays were still being found, and did nothing
+        self.enter_while_thinking = False
+        # (emoji, size) -> texture, None when the image couldn't be generated
+        self.emoji_textures = dict()
+        if EMOJI_ATLAS and ATLAS_PATH.exists() and ATLAS_INDEX_PATH.exists():
+            tile_size, images = read_emoji_atlas()
+            for emoji_char, image in images.items():
+                self.emoji_textures[(emoji_char, tile_size)] = arcade.Texture(f"emoji-atlas-{emoji_char}", image)
+            self.emoji_atlas_tile_size = tile_size
+        else:
+            self.emoji_atlas_tile_size = None
 
         # Timer variables
         self.timer_seconds = 900  # 15 minutes in seconds
@@ -957,6 +505,20 @@ class MyGame(arcade.Window):
                 )
             play_index += 1
 
+        if self.solver_service.thinking:
+            row, column = 13, 15
+            x = (MARGIN + WIDTH) * column + (2 * MARGIN) + TOP_WORD_BOX_WIDTH // 2
+            y = (MARGIN + HEIGHT) * row + MARGIN + HEIGHT // 2 + BOTTOM_MARGIN
+            arcade.draw_text(
+                "thinking… press ENTER again when done" if self.enter_while_thinking else "thinking…",
+                x - HORIZ_TEXT_OFFSET - 130,
+                y - VERT_TEXT_OFFSET * 0.75,
+                arcade.color.DARK_GRAY,
+                20,
+                bold=True,
+                font_name=FONT,
+            )
+
         # Draw remaining tiles
         tiles_left = sorted(self.tile_bag[self.tile_bag_index :] + self.computer.tiles)
         row, column = 14, 15
@@ -1144,13 +706,15 @@ class MyGame(arcade.Window):
 
         # PLAYER WORD SOLVER
         if self.phase == Phase.PLAYERS_TURN and not self.player_plays:
-            self.player_plays = self.generate_all_plays(self.player.tiles)
-            self.filtered_player_plays = [
-                word
-                for word in self.player_plays
-                if len(word.blanks) == 0 or word.score >= 50
-            ][-14:]
-            log("done generating plays", LogType.OK)
+            result = self.poll_plays(self.player.tiles)
+            if result is not None and result.plays:
+                self.player_plays = result.plays
+                self.filtered_player_plays = [
+                    word
+                    for word in self.player_plays
+                    if len(word.blanks) == 0 or word.score >= 50
+                ][-14:]
+                log("done generating plays", LogType.OK)
 
         if self.phase == Phase.ASK_KNOWN_WORD:
             self.draw_dialog(f"Do you know: {self.pending_play.word}?")
@@ -1183,34 +747,28 @@ class MyGame(arcade.Window):
 
         return formatted_word
 
-    def recursive_definition(self, word, num):
-        definition = self.DEFINITIONS[word.upper()]
-        if definition[0] not in ["<", "{"]:
-            return definition
-        redirect_word = definition.split("=")[0][1:]
-        # in case there is infinite recursion, break
-        if num > 10:
-            return definition
-        return f"{definition} || {self.recursive_definition(redirect_word, num + 1)}"
-
     def update_current_word(self, word):
-        self.definition = self.recursive_definition(word, 1)
+        # Redirects to other words' definitions are already resolved in the lexicon
+        self.definition = self.DEFINITIONS[word.upper()]
 
         # Get emoji and generate texture
         try:
-            emoji_char = emoji_manager.get_emoji_for_definition(word, self.definition)
-            if emoji_char:
-                image_path = emoji_manager.generate_emoji_image(emoji_char)
-                if image_path:
-                    self.current_emoji_texture = arcade.load_texture(image_path)
-                else:
-                    self.current_emoji_texture = None
-            else:
-                self.current_emoji_texture = None
+            emoji_char = emoji_manager.get_emoji_for_definition(word, self.definition, wait=False)
+            self.emoji_pending_word = word if emoji_char is None and emoji_manager.loading else None
+            self.current_emoji_texture = self.emoji_texture(emoji_char) if emoji_char else None
         except Exception as e:
             print(f"Error loading emoji: {e}")
             self.current_emoji_texture = None
 
+    def emoji_texture(self, emoji_char, size=512):
+        """The emoji's texture from the atlas, or generated at size, loaded once per session"""
+        if (emoji_char, self.emoji_atlas_tile_size) in self.emoji_textures:
+            return self.emoji_textures[(emoji_char, self.emoji_atlas_tile_size)]
+        if (emoji_char, size) not in self.emoji_textures:
+            image_path = emoji_manager.generate_emoji_image(emoji_char, size)
+            self.emoji_textures[(emoji_char, size)] = arcade.load_texture(image_path) if image_path else None
+        return self.emoji_textures[(emoji_char, size)]
+
     def save_known_words_and_exit(self):
         """Save known words to file and exit the game"""
         try:
@@ -1220,43 +778,24 @@ class MyGame(arcade.Window):
         with open("know.txt", "w") as f:
             f.write("\n".join(sorted(list(self.KNOW))))
         print("Known words saved. Exiting...")
+        self.solver_service.close()
         sys.exit()
 
     def play_word(self, play, tiles):
         # TODO fix the 14 - row
-        row, col = 14 - play.pos.row, play.pos.col
-        row_delta, col_delta = deltas(play.pos.dir)
-        prefix, _ = prefix_tiles(self.grid, play.pos.dir, row, col, self.blank_letters)
-        remaining_tiles = tiles
-        word = play.word
-        for letter in word.removeprefix(prefix):
-            if self.grid.is_empty((row, col)):
-                self.letters_to_highlight.add((14 - row, col))
-                self.grid.set_tile((row, col), letter)
-                if remaining_tiles:
-                    if letter in remaining_tiles:
-                        remaining_tiles.remove(letter)
-                    elif " " in remaining_tiles:
-                        remaining_tiles.remove(" ")
-            col += col_delta
-            row += row_delta
-
-        self.update_current_word(word)
-        return remaining_tiles
+        for row, col in place_play(self.grid, play, tiles):
+            self.letters_to_highlight.add((14 - row, col))
+        self.update_current_word(play.word)
+        return tiles
 
     def apply_computer_play(self, play):
         self.blank_letters = self.blank_letters | play.blanks
 
         self.computer.tiles = self.play_word(play, self.computer.tiles)
 
-        # this was copied
-        tiles_needed = 7 - len(self.computer.tiles)
         if play.is_bingo:
             self.letters_bingoed = self.letters_bingoed.union(self.letters_to_highlight)
-        self.computer.tiles += self.tile_bag[
-            self.tile_bag_index : self.tile_bag_index + tiles_needed
-        ]
-        self.tile_bag_index += tiles_needed
+        self.tile_bag_index = refill_rack(self.computer.tiles, self.tile_bag, self.tile_bag_index)
 
         self.computer.last_word_score = play.score
         self.computer.score += play.score
@@ -1265,32 +804,33 @@ class MyGame(arcade.Window):
         self.last_grid = self.grid.copy()
 
     def on_update(self, delta_time):
+        # on_update first runs after the first frame is drawn
+        if self.emoji_warm_up_pending:
+            self.emoji_warm_up_pending = False
+            if not emoji_manager.has_word_emojis:
+                emoji_manager.warm_up()
+        if self.emoji_pending_word is not None and emoji_manager.ready:
+            self.update_current_word(self.emoji_pending_word)
+
         # Update timer only during player's turn
         if self.phase == Phase.PLAYERS_TURN:
             self.timer_seconds -= delta_time
 
         if self.phase == Phase.COMPUTERS_TURN:
-            sorted_words = self.generate_all_plays(self.computer.tiles)
-
-            if not sorted_words:
-                # No valid plays - computer must pass
-                print("Computer has no valid plays and passes their turn.")
+            # The best play whose word isn't known yet, found without sorting every play
+            result = self.poll_plays(self.computer.tiles, top=1, exclude=self.KNOW)
+            if result is None:
+                return  # still thinking
+
+            if not result.plays:
+                # A search stopped at the deadline has always found a play, so this one ran to the end
+                assert result.complete
+                # No valid plays, or the player knows every word - computer must pass
+                print("Computer has no valid plays outside the known words and passes their turn.")
                 self.phase = Phase.PLAYERS_TURN
                 return
 
-            i = -1
-            # Find a word that's not in KNOW, checking bounds
-            while abs(i) <= len(sorted_words) and sorted_words[i].word in self.KNOW:
-                log(f"skip {sorted_words[i].word} ({abs(i)})", LogType.INFO)
-                i -= 1
-
-            # If we've exhausted all words (all are in KNOW), pass
-            if abs(i) > len(sorted_words):
-                print("Computer knows all possible words and passes their turn.")
-                self.phase = Phase.PLAYERS_TURN
-                return
-
-            play = sorted_words[i]
+            play = result.plays[-1]
 
             if play.word not in self.KNOW:
                 self.pending_play = play
@@ -1318,6 +858,9 @@ class MyGame(arcade.Window):
         )
 
     def setup_for_computers_turn(self, exchanged: Exchange):
+        # The player's plays are no longer needed, whether they played, exchanged or passed
+        self.solver_service.cancel()
+        self.enter_while_thinking = False
         self.letters_typed.clear()
         self.phase = Phase.COMPUTERS_TURN
         self.pause_for_analysis_rank = None
@@ -1564,7 +1107,11 @@ class MyGame(arcade.Window):
             if self.phase == Phase.PAUSE_FOR_ANALYSIS:
                 self.setup_for_computers_turn(Exchange.NO)
 
-            if self.phase == Phase.PLAYERS_TURN:
+            if self.phase == Phase.PLAYERS_TURN and self.solver_service.thinking:
+                log("still finding plays, press ENTER again when done", LogType.INFO)
+                self.enter_while_thinking = True
+            elif self.phase == Phase.PLAYERS_TURN:
+                self.enter_while_thinking = False
                 potential_play = self.is_playable_and_score_and_word()
                 if potential_play.is_ok():
                     log("word is ok", LogType.OK)
@@ -1593,12 +1140,7 @@ class MyGame(arcade.Window):
                         else:
                             self.player.tiles.remove(letter)
                         self.grid.set_tile((14 - row, col), letter)
-                    # we copy pasted the next three lines
-                    tiles_needed = 7 - len(self.player.tiles)
-                    self.player.tiles += self.tile_bag[
-                        self.tile_bag_index : self.tile_bag_index + tiles_needed
-                    ]
-                    self.tile_bag_index += tiles_needed
+                    self.tile_bag_index = refill_rack(self.player.tiles, self.tile_bag, self.tile_bag_index)
                     self.phase = Phase.PAUSE_FOR_ANALYSIS
                     self.grid_backup = self.grid.copy()
                     self.cursor.dir = None
@@ -1614,6 +1156,20 @@ class MyGame(arcade.Window):
         return self.is_playable_and_score_and_word().is_ok()
 
     def is_playable_and_score_and_word(self):
+        # on_draw asks every frame, but the answer only changes after a key press or a board change
+        blank_letters = self.temp_blank_letters | self.blank_letters
+        key = (
+            self.grid.version,
+            tuple(self.letters_typed.items()),
+            self.cursor.dir,
+            frozenset(blank_letters),
+        )
+        if key != self.typed_play_key:
+            self.typed_play_key = key
+            self.typed_play = self.score_typed_letters(blank_letters)
+        return self.typed_play
+
+    def score_typed_letters(self, blank_letters):
         if len(self.letters_typed):
             start_row, start_col = next(iter(self.letters_typed))
             dir = self.cursor.dir
@@ -1625,35 +1181,13 @@ class MyGame(arcade.Window):
                 letters,
                 pos,
                 True,
-                self.temp_blank_letters | self.blank_letters,
+                blank_letters,
             )
         return Err("no letters typed")
 
-    def generate_all_plays(self, tiles):
-        plays = SolverState(self.trie, self.grid, tiles).find_all_options()
-        valid_plays = []
-        seen_word_scores = set()  # Track (word, score) combinations to avoid duplicates
-        is_first_turn = self.grid.is_first_turn()
-        for pos, letters, blanks in plays:
-            # Skip vertical plays on first turn (duplicates of horizontal due to symmetry)
-            if is_first_turn and pos.dir == Direction.DOWN:
-                continue
-            score = word_score(
-                self.grid,
-                self.trie,
-                letters,
-                Position(pos.dir, 14 - pos.row, pos.col),
-                True,
-                blanks | self.blank_letters,
-            )
-            if score.is_ok():
-                play = score.unwrap()
-                word_score_pair = (play.word, play.score)
-                if word_score_pair not in seen_word_scores:
-                    seen_word_scores.add(word_score_pair)
-                    valid_plays.append(play)
-        return sorted(valid_plays)
-
+    def poll_plays(self, tiles, top=None, exclude=frozenset()):
+        """The solve result for tiles on the current grid, or None while the solver service is thinking"""
+        return self.solver_service.poll(self.grid, tiles, self.blank_letters, top, exclude)
 
 def main():
     MyGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
@@ -0,0 +1,82 @@
+# Move generation across a pool of worker processes.
+# A solve is split into one task per (direction, anchor row). Every worker loads the lexicon once
+# when it starts (from the compiled file when there is one, so all workers share its pages) and
+# keeps its own copy of the board, which each task brings up to date from a 225 byte snapshot.
+# That way the incremental cross-check cache survives from one solve to the next in every worker.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Event
+
+from board import EMPTY, Board, CellCoord, Direction
+from lexicon import Lexicon, load_lexicon
+from rules import Play
+from solver import SolveCancelledError, SolverState
+
+# Per worker process state, set up by _init_worker
+_lexicon: Lexicon
+_board: Board
+
+
+def _init_worker(lexicon: Lexicon | str) -> None:
+    global _lexicon, _board
+    _lexicon = load_lexicon(lexicon) if isinstance(lexicon, str) else lexicon
+    _board = Board()
+
+
+def _sync_board(snapshot: bytes) -> Board:
+    """Apply the squares that differ from snapshot to this worker's board"""
+    size = _board.size
+    for square, code in enumerate(snapshot):
+        row, col = divmod(square, size)
+        tile = "." if code == EMPTY else chr(code)
+        if _board.tile((row, col)) != tile:
+            _board.set_tile((row, col), tile)
+    return _board
+
+
+def _solve(snapshot: bytes, rack, blank_letters: set[CellCoord], direction: Direction, row: int) -> list[Play]:
+    solver = SolverState(_lexicon.dawg, _sync_board(snapshot), rack)
+    solver.blank_letters = blank_letters
+    solver.find_options(direction, {row})
+    return solver.plays
+
+
+class SolverPool:
+    """Finds the same plays as SolverState.find_all_plays, in the same order"""
+
+    def __init__(self, lexicon: Lexicon, workers: int | None = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        # A loaded lexicon is a view of an mmap, which can't be pickled, so workers open the file themselves
+        initargs = (lexicon.path if lexicon.path is not None else lexicon,)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=initargs)
+
+    def find_all_plays(self, board: Board, rack, blank_letters: set[CellCoord],
+                       cancel_event: Event | None = None) -> list[Play]:
+        snapshot = board.snapshot()
+        anchors = [(7, 7)] if board.is_first_turn() else board.anchors()
+        rows = sorted({row for row, _ in anchors})
+        # Tasks are listed in the order the sequential solver visits anchors, so concatenating
+        # their results reproduces its output exactly
+        futures = [
+            self.executor.submit(_solve, snapshot, rack.copy(), blank_letters, direction, row)
+            for direction in Direction
+            for row in rows
+        ]
+        plays = []
+        for future in futures:
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise SolveCancelledError()
+            plays += future.result()
+        return plays
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "SolverPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,539 @@
+"""
+Board layout, tile values and move scoring shared by the game, the solver and headless tools
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+
+from result import Err, Ok
+
+from board import EMPTY, CellCoord, Direction, Letter, Position
+
+
+class Tl(Enum):
+    NO = 1
+    DL = 2
+    DW = 3
+    TL = 4
+    TW = 5
+
+
+BOARD = [
+    [
+        Tl.TW,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.TW,
+    ],
+    [
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.TW,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.TW,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+    ],
+    [
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+    ],
+    [
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DW,
+        Tl.NO,
+    ],
+    [
+        Tl.TW,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.TW,
+        Tl.NO,
+        Tl.NO,
+        Tl.NO,
+        Tl.DL,
+        Tl.NO,
+        Tl.NO,
+        Tl.TW,
+    ],
+]
+
+TILE_BAG = (
+    ["A"] * 9
+    + ["B"] * 2
+    + ["C"] * 2
+    + ["D"] * 4
+    + ["E"] * 12
+    + ["F"] * 2
+    + ["G"] * 3
+    + ["H"] * 2
+    + ["I"] * 9
+    + ["J"] * 1
+    + ["K"] * 1
+    + ["L"] * 4
+    + ["M"] * 2
+    + ["N"] * 6
+    + ["O"] * 8
+    + ["P"] * 2
+    + ["Q"] * 1
+    + ["R"] * 6
+    + ["S"] * 4
+    + ["T"] * 6
+    + ["U"] * 4
+    + ["V"] * 2
+    + ["W"] * 2
+    + ["X"] * 1
+    + ["Y"] * 2
+    + ["Z"] * 1
+    + [" "] * 2
+)
+
+TILE_SCORE = {
+    "A": 1,
+    "B": 3,
+    "C": 3,
+    "D": 2,
+    "E": 1,
+    "F": 4,
+    "G": 2,
+    "H": 4,
+    "I": 1,
+    "J": 8,
+    "K": 5,
+    "L": 1,
+    "M": 3,
+    "N": 1,
+    "O": 1,
+    "P": 3,
+    "Q": 10,
+    "R": 1,
+    "S": 1,
+    "T": 1,
+    "U": 1,
+    "V": 4,
+    "W": 4,
+    "X": 8,
+    "Y": 4,
+    "Z": 10,
+    " ": 0,
+}
+
+
+class Extension(Enum):
+    PREFIX = 1
+    SUFFIX = 2
+
+
+@dataclass(frozen=True, order=True)
+class Play:
+    score: int
+    word: str
+    pos: Position
+    is_bingo: bool
+    blanks: set[CellCoord]
+    leave: float = field(default=0.0, compare=False)  # value of the tiles kept, when solved with a leave table
+
+
+def letter_multiplier(row: int, col: int) -> int:
+    if BOARD[row][col] == Tl.DL:
+        return 2
+    if BOARD[row][col] == Tl.TL:
+        return 3
+    return 1
+
+
+def word_multiplier(row: int, col: int) -> int:
+    if BOARD[row][col] == Tl.DW:
+        return 2
+    if BOARD[row][col] == Tl.TW:
+        return 3
+    return 1
+
+
+# The same multipliers indexed by row * 15 + col, for the move generator
+LETTER_MULTIPLIERS = [letter_multiplier(row, col) for row in range(15) for col in range(15)]
+WORD_MULTIPLIERS = [word_multiplier(row, col) for row in range(15) for col in range(15)]
+
+
+def deltas(dir) -> tuple[int, int]:
+    row_delta = 1 if dir == Direction.DOWN else 0
+    col_delta = 0 if dir == Direction.DOWN else 1
+    return (row_delta, col_delta)
+
+
+def extension_tiles(ext, board, dir, row, col, blank_poss):
+    delta_factor = -1 if ext == Extension.PREFIX else 1
+    row_delta, col_delta = tuple(delta_factor * i for i in list(deltas(dir)))
+    next_row, next_col, tiles, score = row, col, "", 0
+    while True:
+        next_row += row_delta
+        next_col += col_delta
+        pos = (next_row, next_col)
+        if board.is_filled(pos):
+            tiles += board.tile(pos)
+            if (14 - next_row, next_col) not in blank_poss:
+                score += TILE_SCORE.get(board.tile(pos))
+        else:
+            break
+    return (tiles[::delta_factor], score)
+
+
+def prefix_tiles(board, dir, row, col, blank_poss):
+    return extension_tiles(Extension.PREFIX, board, dir, row, col, blank_poss)
+
+
+def suffix_tiles(board, dir, row, col, blank_poss):
+    return extension_tiles(Extension.SUFFIX, board, dir, row, col, blank_poss)
+
+
+def word_score(board, dictionary, letters, pos, first_call, blank_poss):
+    dir, row, col = pos.dir, 14 - pos.row, pos.col
+    if board.is_filled((row, col)):
+        return Err("cannot start word on existing tile")
+    rest_of_row = (
+        board.row(row)[col:] if dir == Direction.ACROSS else board.column(col)[row:]
+    )
+    if rest_of_row.count(EMPTY) < len(letters):
+        return Err("outside of board")
+
+    word_played, score = prefix_tiles(board, dir, row, col, blank_poss)
+    has_prefix = len(word_played) > 0
+    word_mult = 1
+    row_delta, col_delta = deltas(dir)
+    crosses = len(word_played) > 0
+    valid_start = False
+    blanks = set()
+    letters_played = 0
+
+    perpandicular_words = []
+
+    for letter in letters:
+        while board.is_filled((row, col)):
+            word_played = word_played + board.tile((row, col))
+            if (14 - row, col) not in blank_poss:
+                score += TILE_SCORE.get(board.tile((row, col)))
+            row += row_delta
+            col += col_delta
+            crosses = True
+        letters_played += 1
+        word_played += letter
+        word_mult *= word_multiplier(row, col)
+        if (14 - row, col) not in blank_poss:
+            score += TILE_SCORE.get(letter) * letter_multiplier(row, col)
+        else:
+            blanks.add((14 - row, col))
+        if len(letters) == 1:
+            one_letter_score = TILE_SCORE.get(letter) * letter_multiplier(row, col)
+
+        # find perpendicular words that need to be scored
+        if dir == Direction.ACROSS:
+            if board.is_filled((row + 1, col)) or board.is_filled((row - 1, col)):
+                perpandicular_words.append((letter, (row, col)))
+        else:
+            if board.is_filled((row, col + 1)) or board.is_filled((row, col - 1)):
+                perpandicular_words.append((letter, (row, col)))
+        if row * col == 49:
+            valid_start = True
+        row += row_delta
+        col += col_delta
+
+    suffix, suffix_score = suffix_tiles(
+        board, dir, row - row_delta, col - col_delta, blank_poss
+    )
+    word_played += suffix
+    has_suffix = len(suffix) > 0
+
+    score += suffix_score
+
+    if not has_prefix and not has_suffix and len(letters) == 1:
+        score -= one_letter_score
+
+    score *= word_mult
+    score += 50 if len(letters) == 7 else 0
+
+    if (
+        not crosses
+        and len(suffix) == 0
+        and len(perpandicular_words) == 0
+        and first_call
+    ):
+        if board.is_first_turn():
+            if not valid_start:
+                return Err("first move must be through center tile")
+        else:
+            return Err("does not overlap with any other word")
+
+    if first_call:
+        opposite_dir = Direction.ACROSS if dir == Direction.DOWN else Direction.DOWN
+        for word, (r, c) in perpandicular_words:
+            new_pos = Position(opposite_dir, 14 - r, c)
+            potential_play = word_score(
+                board, dictionary, word, new_pos, False, blank_poss
+            )
+            if potential_play.is_ok():
+                play = potential_play.unwrap()
+                score += play.score
+                if len(word_played) == 1:
+                    word_played = play.word
+            else:
+                return potential_play
+
+    if not dictionary.is_word(word_played) and not (
+        len(word_played) == 1 and len(perpandicular_words)
+    ):
+        return Err(f"{word_played} not in dictionary")
+
+    return Ok(Play(score, word_played, pos, letters_played == 7, blanks))
+
+
+def new_tiles(board, play: Play) -> list[tuple[CellCoord, Letter]]:
+    """The squares of play that are still empty on board, with the letter that goes on each"""
+    # play.pos is the first new tile, play.word also spells the tiles already on the board before it
+    row, col = 14 - play.pos.row, play.pos.col
+    row_delta, col_delta = deltas(play.pos.dir)
+    prefix, _ = prefix_tiles(board, play.pos.dir, row, col, set())
+    tiles = []
+    for letter in play.word.removeprefix(prefix):
+        if board.is_empty((row, col)):
+            tiles.append(((row, col), letter))
+        row += row_delta
+        col += col_delta
+    return tiles
+
+
+def place_play(board, play: Play, rack: list[Letter] | None) -> list[CellCoord]:
+    """Put play's new tiles on board, taking them off rack if given, and return their squares"""
+    placed = new_tiles(board, play)
+    for square, letter in placed:
+        board.set_tile(square, letter)
+        if rack:
+            if letter in rack:
+                rack.remove(letter)
+            elif " " in rack:
+                rack.remove(" ")
+    return [square for square, _ in placed]
+
+
+def refill_rack(rack: list[Letter], tile_bag: list[Letter], tile_bag_index: int) -> int:
+    """Draw tile_bag[tile_bag_index:] onto rack until it holds 7, returning the new index"""
+    tiles_needed = 7 - len(rack)
+    rack += tile_bag[tile_bag_index : tile_bag_index + tiles_needed]
+    return tile_bag_index + tiles_needed
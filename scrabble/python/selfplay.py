@@ -0,0 +1,169 @@
+"""
+Play complete computer-vs-computer games without a window and report solver throughput
+
+Usage: python3 selfplay.py [--games N] [--seed SEED] [--workers N] [--words WORDS] [--stats] [--leaves]
+       [--sim N] [--sim-ms MS] [--endgame-ms MS]
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from result import Ok, Result
+
+from board import Board, CellCoord
+from cross_check import cross_checks
+from endgame import solve_endgame
+from leaves import LeaveTable, equity, leave_table
+from lexicon import Lexicon, build_lexicon, nwl_2020, read_word_list
+from parallel import SolverPool
+from rules import (
+    TILE_BAG,
+    TILE_SCORE,
+    Play,
+    new_tiles,
+    place_play,
+    refill_rack,
+    word_score,
+)
+from simulation import SIM_TIME_BUDGET_MS, Simulator
+from solver import generate_all_plays
+from solver_stats import SolverStats
+
+PHASES = ["cross-checks", "movegen", "simulate", "endgame", "verify", "apply"]
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.games = 0
+        self.moves = 0
+        self.candidates = 0
+        self.disagreements = 0  # chosen plays that word_score scores differently or rejects
+        self.phase_seconds: dict[str, float] = defaultdict(float)
+        self.solver: SolverStats | None = None  # totals over every solve, with --stats
+        self.leaves: LeaveTable | None = None  # choose plays by score plus leave value, with --leaves
+        self.simulator: Simulator | None = None  # choose plays by simulated spread, with --sim
+        self.endgame_ms: int | None = None  # search the endgame once the bag is empty, with --endgame-ms
+
+    def timed(self, phase: str, start: float) -> float:
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - start
+        return now
+
+
+def verify(lexicon: Lexicon, board: Board, play: Play, blank_letters: set[CellCoord]) -> bool:
+    """Score play the way the game scores a typed word and check that it agrees with the solver"""
+    letters = "".join(letter for _, letter in new_tiles(board, play))
+    result: Result[Play, str] = word_score(board, lexicon.dawg, letters, play.pos, True, blank_letters | play.blanks)
+    return result == Ok(play)
+
+
+def play_game(lexicon: Lexicon, rng: random.Random, pool: SolverPool | None, stats: Stats) -> list[int]:
+    tile_bag = TILE_BAG[:]
+    rng.shuffle(tile_bag)
+    racks = [tile_bag[0:7], tile_bag[7:14]]
+    tile_bag_index = 14
+    scores = [0, 0]
+    board = Board()
+    blank_letters: set[CellCoord] = set()
+    passes = 0
+    turn = 0
+    while passes < 2 and all(racks):
+        rack = racks[turn]
+        solve_stats = SolverStats() if stats.solver is not None else None
+        start = time.perf_counter()
+        cross_checks(board, lexicon.dawg, solve_stats)
+        start = stats.timed("cross-checks", start)
+        plays = generate_all_plays(lexicon, board, rack.copy(), blank_letters, pool, stats=solve_stats,
+                                   leaves=stats.leaves)
+        start = stats.timed("movegen", start)
+        if stats.solver is not None and solve_stats is not None:
+            stats.solver.add(solve_stats)
+        stats.candidates += len(plays)
+        stats.moves += 1
+        play: Play | None
+        if not plays:
+            play = None
+        elif stats.endgame_ms is not None and tile_bag_index >= len(tile_bag):
+            result = solve_endgame(lexicon, board, (rack, racks[1 - turn]), blank_letters, stats.endgame_ms)
+            play = result.play
+            start = stats.timed("endgame", start)
+        elif stats.simulator is not None:
+            unseen = tile_bag[tile_bag_index:] + racks[1 - turn]
+            game_spread = scores[turn] - scores[1 - turn]
+            results = stats.simulator.simulate(board, rack, blank_letters, unseen, plays, game_spread, stats.moves)
+            play = results[-1].play
+            start = stats.timed("simulate", start)
+        elif stats.leaves is not None:
+            play = max(reversed(plays), key=equity)
+        else:
+            play = plays[-1]
+        if play is None:
+            passes += 1
+        else:
+            passes = 0
+            if not verify(lexicon, board, play, blank_letters):
+                stats.disagreements += 1
+            start = stats.timed("verify", start)
+            place_play(board, play, rack)
+            blank_letters |= play.blanks
+            tile_bag_index = refill_rack(rack, tile_bag, tile_bag_index)
+            scores[turn] += play.score
+            stats.timed("apply", start)
+        turn = 1 - turn
+
+    # Same end-of-game bonus as the game: twice the tiles left on the other rack
+    for player in range(2):
+        if not racks[player]:
+            scores[player] += 2 * sum(TILE_SCORE[tile] for tile in racks[1 - player])
+    stats.games += 1
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play computer-vs-computer games and report solver throughput")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0, help="game i is dealt from random.Random(seed + i)")
+    parser.add_argument("--workers", type=int, default=0, help="generate moves in this many processes")
+    parser.add_argument("--words", help="word list to build the lexicon from instead of the default one")
+    parser.add_argument("--stats", action="store_true", help="count solver work (not available with --workers)")
+    parser.add_argument("--leaves", action="store_true", help="choose the play with the best score plus leave value")
+    parser.add_argument("--sim", type=int, default=0, metavar="N", help="choose among the N best plays by simulation")
+    parser.add_argument("--sim-ms", type=int, default=SIM_TIME_BUDGET_MS, help="time budget of each simulation")
+    parser.add_argument("--endgame-ms", type=int, help="search for the best play once the bag is empty, for this long")
+    args = parser.parse_args()
+
+    lexicon = build_lexicon(read_word_list(args.words)) if args.words else nwl_2020()
+    pool = SolverPool(lexicon, args.workers) if args.workers else None
+    stats = Stats()
+    if args.stats:
+        stats.solver = SolverStats()
+    if args.leaves:
+        stats.leaves = leave_table()
+    if args.sim:
+        stats.simulator = Simulator(lexicon, args.workers, args.sim, time_budget_ms=args.sim_ms)
+    stats.endgame_ms = args.endgame_ms
+    start = time.perf_counter()
+    for i in range(args.games):
+        scores = play_game(lexicon, random.Random(args.seed + i), pool, stats)
+        print(f"game {i}: {scores[0]} - {scores[1]}")
+    elapsed = time.perf_counter() - start
+    if pool is not None:
+        pool.close()
+    if stats.simulator is not None:
+        stats.simulator.close()
+
+    print(f"{stats.games / elapsed:.3f} games/s, {stats.moves / elapsed:.2f} moves/s, "
+          f"{stats.candidates / max(stats.moves, 1):.1f} candidates/move")
+    for phase in PHASES:
+        seconds = stats.phase_seconds[phase]
+        print(f"{phase:>12} {seconds:8.2f} s {100 * seconds / elapsed:5.1f}%")
+    if stats.solver is not None:
+        print(stats.solver)
+    if stats.disagreements:
+        print(f"word_score disagreed with the solver on {stats.disagreements} plays")
+
+
+if __name__ == "__main__":
+    main()
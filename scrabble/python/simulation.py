@@ -0,0 +1,188 @@
+# Monte Carlo simulation ("simming") of the best candidate plays.
+# A rollout makes a candidate play, deals the opponent a random rack from the unseen tiles, plays a
+# few more plies greedily for both sides and records how the spread changed. Rollout i draws the
+# same tiles for every candidate, so candidates are compared on equal luck, and a candidate whose
+# mean spread is clearly behind the leader's stops being simulated. Rollouts run in batches, in
+# process or on a pool of workers that load the lexicon once, the same way parallel.py does.
+
+import math
+import os
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+from board import Board, CellCoord
+from lexicon import Lexicon, load_lexicon
+from rules import TILE_SCORE, Play, place_play, refill_rack
+from solver import generate_all_plays
+
+SIM_CANDIDATES = 10
+SIM_PLIES = 2  # replies after the candidate play, alternating opponent and us
+SIM_TIME_BUDGET_MS = 2000
+SIM_MAX_ROLLOUTS = 1000
+BATCH_SIZE = 8  # rollouts per candidate in each pool task; in process the clock is checked after every rollout
+MIN_ROLLOUTS = 16  # before a candidate can be dropped
+DOMINANCE_Z = 2.0  # standard errors by which a candidate must trail the leader to be dropped
+
+
+@dataclass
+class SimResult:
+    play: Play
+    rollouts: int = 0
+    wins: float = 0.0  # a tie counts as half a win
+    spread_total: float = 0.0
+    spread_squares: float = 0.0
+    dominated: bool = False  # dropped before the end of the simulation
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.rollouts if self.rollouts else 0.0
+
+    @property
+    def mean_spread(self) -> float:
+        return self.spread_total / self.rollouts if self.rollouts else 0.0
+
+    @property
+    def standard_error(self) -> float:
+        if self.rollouts < 2:
+            return math.inf
+        variance = max(self.spread_squares / self.rollouts - self.mean_spread ** 2, 0.0)
+        return math.sqrt(variance / (self.rollouts - 1))
+
+    def add(self, spreads: list[int], game_spread: int) -> None:
+        for spread in spreads:
+            self.rollouts += 1
+            self.spread_total += spread
+            self.spread_squares += spread * spread
+            final_spread = game_spread + spread
+            self.wins += 1.0 if final_spread > 0 else 0.5 if final_spread == 0 else 0.0
+
+
+def rollout(lexicon: Lexicon, board: Board, blank_letters: set[CellCoord], rack: list[str],
+            unseen: list[str], play: Play, plies: int, seed: int) -> int:
+    """Change in spread, from the point of view of the player to move, after play and plies greedy replies"""
+    rng = random.Random(seed)
+    board = board.copy()
+    tile_bag = unseen.copy()
+    rng.shuffle(tile_bag)
+    racks = [rack.copy(), tile_bag[:7]]
+    place_play(board, play, racks[0])
+    blank_letters = blank_letters | play.blanks
+    tile_bag_index = refill_rack(racks[0], tile_bag, len(racks[1]))
+    spread = play.score
+    turn = 1
+    for _ in range(plies):
+        if not all(racks):
+            break
+        plays = generate_all_plays(lexicon, board, racks[turn].copy(), blank_letters)
+        if plays:
+            reply = plays[-1]
+            place_play(board, reply, racks[turn])
+            blank_letters = blank_letters | reply.blanks
+            tile_bag_index = refill_rack(racks[turn], tile_bag, tile_bag_index)
+            spread += reply.score if turn == 0 else -reply.score
+        turn = 1 - turn
+
+    # Same end-of-game bonus as the game: twice the tiles left on the other rack
+    if not racks[0]:
+        spread += 2 * sum(TILE_SCORE[tile] for tile in racks[1])
+    elif not racks[1]:
+        spread -= 2 * sum(TILE_SCORE[tile] for tile in racks[0])
+    return spread
+
+
+# Per worker process state, set up by _init_worker
+_lexicon: Lexicon
+
+
+def _init_worker(lexicon: Lexicon | str) -> None:
+    global _lexicon
+    _lexicon = load_lexicon(lexicon) if isinstance(lexicon, str) else lexicon
+
+
+def _rollouts(board: Board, blank_letters: set[CellCoord], rack: list[str], unseen: list[str], play: Play,
+              plies: int, seeds: list[int]) -> list[int]:
+    return [rollout(_lexicon, board, blank_letters, rack, unseen, play, plies, seed) for seed in seeds]
+
+
+class Simulator:
+    """Ranks the best candidates of generate_all_plays by simulated spread instead of score"""
+
+    def __init__(self, lexicon: Lexicon, workers: int | None = 0,
+                 candidates: int = SIM_CANDIDATES, plies: int = SIM_PLIES,
+                 time_budget_ms: int = SIM_TIME_BUDGET_MS, max_rollouts: int = SIM_MAX_ROLLOUTS) -> None:
+        """workers=0 runs the rollouts in this process, None uses one worker per CPU"""
+        self.lexicon = lexicon
+        self.candidates = candidates
+        self.plies = plies
+        self.time_budget_ms = time_budget_ms
+        self.max_rollouts = max_rollouts
+        self.executor = None
+        if workers != 0:
+            # A loaded lexicon is a view of an mmap, which can't be pickled, so workers open the file themselves
+            initargs = (lexicon.path if lexicon.path is not None else lexicon,)
+            self.executor = ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=_init_worker,
+                                                initargs=initargs)
+
+    def simulate(self, board: Board, rack: list[str], blank_letters: set[CellCoord], unseen: list[str],
+                 plays: list[Play], game_spread: int = 0, seed: int = 0) -> list[SimResult]:
+        """Simulate the last self.candidates plays (best last, as generate_all_plays returns them)
+
+        unseen is every tile the player to move can't see: the rest of the bag and the opponent's rack.
+        game_spread is the player's score minus the opponent's before the play, used for the win rate.
+        Returns the candidates best last by mean spread. The time budget can be overrun by one round
+        of rollouts, one per candidate still being simulated (BATCH_SIZE on a pool).
+        """
+        results = [SimResult(play) for play in plays[-self.candidates:]]
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        batch_size = BATCH_SIZE if self.executor is not None else 1
+        done = 0
+        while done < self.max_rollouts:
+            live = [result for result in results if not result.dominated]
+            if len(live) < 2 and done >= MIN_ROLLOUTS:
+                break
+            seeds = [seed * self.max_rollouts + i for i in range(done, min(done + batch_size, self.max_rollouts))]
+            for result, spreads in zip(live, self._run_batch(board, blank_letters, rack, unseen, live, seeds)):
+                result.add(spreads, game_spread)
+            done += len(seeds)
+            if done >= MIN_ROLLOUTS:
+                _drop_dominated(live)
+            if time.perf_counter() >= deadline:
+                break
+        return sorted(results, key=lambda result: result.mean_spread)
+
+    def _run_batch(self, board: Board, blank_letters: set[CellCoord], rack: list[str], unseen: list[str],
+                   live: list[SimResult], seeds: list[int]) -> list[list[int]]:
+        if self.executor is None:
+            return [
+                [rollout(self.lexicon, board, blank_letters, rack, unseen, result.play, self.plies, seed)
+                 for seed in seeds]
+                for result in live
+            ]
+        futures: list[Future[list[int]]] = [
+            self.executor.submit(_rollouts, board, blank_letters, rack, unseen, result.play, self.plies, seeds)
+            for result in live
+        ]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "Simulator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _drop_dominated(live: list[SimResult]) -> None:
+    """Mark the candidates whose mean spread is significantly below the leader's"""
+    leader = max(live, key=lambda result: result.mean_spread)
+    for result in live:
+        if result is leader:
+            continue
+        margin = DOMINANCE_Z * math.hypot(leader.standard_error, result.standard_error)
+        if result.mean_spread + margin < leader.mean_spread:
+            result.dominated = True
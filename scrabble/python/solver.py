@@ -1,27 +1,98 @@
 # Inital code taken from https://github.com/boringcactus/Appel-Jacobson-scrabble/blob/canon/board.py
 
+import heapq
+import time
 from collections import defaultdict
-from typing import Any
+from collections.abc import Callable, Collection, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, replace
+from threading import Event
+from typing import TYPE_CHECKING, Any
 
-from board import Board, CellCoord, Direction, Letter, Position
-from trie import Trie, TrieNode
+from board import EMPTY, Board, CellCoord, Direction, Letter, Position
+from cross_check import ALL_LETTERS, LETTER_BITS, cross_checks, letters_in
+from dawg import Dawg
+from lexicon import Lexicon
+from rules import LETTER_MULTIPLIERS, TILE_SCORE, WORD_MULTIPLIERS, Play, new_tiles
+from solver_stats import SolverStats
+
+if TYPE_CHECKING:
+    from leaves import LeaveTable
+    from parallel import SolverPool
+
+
+# The rack is a count per letter, A to Z, followed by the number of blanks
+BLANK = 26
+ORD_A = ord("A")
+
+
+def rack_counts(rack: list[Letter]) -> list[int]:
+    counts = [0] * (BLANK + 1)
+    for tile in rack:
+        counts[BLANK if tile == " " else ord(tile) - ORD_A] += 1
+    return counts
+
+
+def leave_counts(board: Board, play: Play, rack: list[Letter]) -> list[int]:
+    """rack_counts of what is left of rack once play's new tiles are taken off it"""
+    counts = rack_counts(rack)
+    for (row, col), letter in new_tiles(board, play):
+        counts[BLANK if (14 - row, col) in play.blanks else ord(letter) - ORD_A] -= 1
+    return counts
+
+
+class SolveCancelledError(Exception):
+    """Raised out of a solve whose cancel event was set"""
+
+
+class SolveTimeoutError(SolveCancelledError):
+    """Raised out of a solve whose deadline has passed"""
+
+
+# Search nodes visited between looks at the clock, when the solver has a deadline
+DEADLINE_CHECK_NODES = 256
 
 
 class SolverState:
     board: Board
-    # rack: ???
-    # original_rack: ???
-    # cross_check_results: ???
+    rack: list[Letter]  # as passed in, the generator works on counts instead
+    original_counts: list[int]
+    counts: list[int]  # tiles still on the rack during generation, see rack_counts
+    rack_mask: int  # letters with a nonzero count, as in cross_check.letter_bit
+    cross_check_results: list[int] | None
+    cross_scores: list[int]
+    blank_letters: set[CellCoord] | None  # only set when scoring plays, same convention as word_score
     direction: Direction | None
+    cancel_event: Event | None  # checked once per anchor
+    stats: SolverStats | None  # filled in during the solve when set
+    deadline: float | None  # time.perf_counter() by which to stop, checked as the search goes
+    timed_out: bool  # iter_plays_by_bound stopped at the deadline
+    plays_found: int  # plays iter_plays_by_bound has yielded so far
+    leaves: "LeaveTable | None"  # values the leave of each scored play when set
+    exclude: Callable[[str], bool] | None  # scored plays of words it accepts are dropped
+    score_floor: int | None  # scored plays below it are dropped
     plays: list[Any]  # This should be better defined: List[Tuple[Position, str, Set[CellCoord]]] or List[Play] as defined in main.py???
 
-    def __init__(self, dictionary: Trie, board: Board, rack): # What is the type of rack?
+    def __init__(self, dictionary: Dawg, board: Board, rack): # What is the type of rack?
         self.dictionary = dictionary
         self.board = board
-        self.original_rack = rack.copy()
         self.rack = rack
+        self.original_counts = rack_counts(rack)
+        self.counts = self.original_counts.copy()
+        self.rack_mask = sum(1 << i for i in range(BLANK) if self.counts[i])
         self.cross_check_results = None
+        self.cross_scores = []
+        self.blank_letters = None
         self.direction = None
+        self.cancel_event = None
+        self.stats = None
+        self.deadline = None
+        self.deadline_countdown = DEADLINE_CHECK_NODES
+        self.timed_out = False
+        self.plays_found = 0
+        self.leaves = None
+        self.exclude = None
+        self.score_floor = None
         self.plays = []
 
     def before(self, pos: CellCoord) -> CellCoord:
@@ -53,143 +124,523 @@ class SolverState:
         word_idx = len(word) - 1
         letters_actually_played = ""
         blanks: set[CellCoord] = set()
-        letters_remaining = self.original_rack.copy()
+        # Like word_score, a letter that is also played as a blank takes the blanks on its first squares.
+        # A blank only stands for a letter once the rack has none of it left, so every real tile of a
+        # letter the play uses is on the board: real_left counts down how many are still to be placed.
+        real_left: dict[int, int] | None = None
+        if self.counts[BLANK] != self.original_counts[BLANK]:
+            real_left = {}
+        scoring = self.blank_letters is not None
+        if scoring and self.exclude is not None and self.exclude(word):
+            return
+        score, word_mult, cross_words_score = 0, 1, 0
         while word_idx >= 0:
             if self.board.is_empty(play_pos):
                 row, col = play_pos
                 letter = word[word_idx]
                 letters_actually_played += letter
-                if letter in letters_remaining:
-                    letters_remaining.remove(letter)
-                else:
-                    letters_remaining.remove(" ")
+                slot = ord(letter) - ORD_A
+                if real_left is not None and not real_left.setdefault(slot, self.original_counts[slot] - self.counts[slot]):
                     blanks.add((14 - row, col))
+                    tile_score = 0
+                else:
+                    if real_left is not None:
+                        real_left[slot] -= 1
+                    tile_score = TILE_SCORE[letter]
+                if scoring:
+                    square = row * self.board.size + col
+                    tile_score *= LETTER_MULTIPLIERS[square]
+                    score += tile_score
+                    word_mult *= WORD_MULTIPLIERS[square]
+                    if self.cross_scores[square] >= 0:
+                        cross_words_score += (self.cross_scores[square] + tile_score) * WORD_MULTIPLIERS[square]
+            elif scoring:
+                assert self.blank_letters is not None
+                if (14 - play_pos[0], play_pos[1]) not in self.blank_letters:
+                    score += TILE_SCORE[word[word_idx]]
             if word_idx == 0:
                 assert self.direction is not None # if check_untyped_defs is active, then mypy warns: dir might be None in the construction of Position below
                                                   # we get rid of this warning by adding the assert
-                pos = Position(dir=self.direction, row=row, col=col)
-                self.plays.append((pos, letters_actually_played[::-1], blanks))
+                if scoring:
+                    is_bingo = len(letters_actually_played) == 7
+                    score = score * word_mult + cross_words_score + (50 if is_bingo else 0)
+                    if self.score_floor is not None and score < self.score_floor:
+                        return
+                    # The tiles of this play are off the rack, so what is still on it is the leave
+                    leave = self.leaves.value(self.counts) if self.leaves is not None else 0.0
+                    self.plays.append(Play(score, word, Position(self.direction, 14 - row, col), is_bingo, blanks, leave))
+                else:
+                    pos = Position(dir=self.direction, row=row, col=col)
+                    self.plays.append((pos, letters_actually_played[::-1], blanks))
             word_idx -= 1
             play_pos = self.before(play_pos)
 
+    def take(self, code: int) -> int:
+        """Take letter code off the rack, or a blank if it has none left; returns the slot used"""
+        if self.stats is not None:
+            self.stats.tiles_placed += 1
+        bit = LETTER_BITS[code]
+        if self.rack_mask & bit:
+            slot = code - ORD_A
+            self.counts[slot] -= 1
+            if not self.counts[slot]:
+                self.rack_mask ^= bit
+            return slot
+        self.counts[BLANK] -= 1
+        return BLANK
+
+    def put_back(self, slot: int) -> None:
+        if not self.counts[slot] and slot != BLANK:
+            self.rack_mask |= 1 << slot
+        self.counts[slot] += 1
+
+    def playable(self) -> int:
+        """Mask of the letters the rack can still provide"""
+        return ALL_LETTERS if self.counts[BLANK] else self.rack_mask
+
     def cross_check_for_display(self, on_rack: bool): # -> ??? Dict[CellCoord, Set[str]] ???
         self.direction = Direction.ACROSS
         a = self.cross_check()
         self.direction = Direction.DOWN
         b = self.cross_check()
+        rack = set(self.rack)
         result = defaultdict(set)
-        for pos in self.find_anchors():
-            result[pos] = a[pos] & b[pos] & set(self.rack) if on_rack else a[pos] & b[pos]
+        for row, col in self.find_anchors():
+            legal_here = letters_in(a[row * self.board.size + col] & b[row * self.board.size + col])
+            result[(row, col)] = legal_here & rack if on_rack else legal_here
         return result
 
-    def cross_check(self) -> dict[CellCoord, set[Letter]]:
-        result: dict[CellCoord, set[Letter]] = dict()
-        for pos in self.board.all_positions():
-            if self.board.is_filled(pos):
-                result[pos] = set()
-            letters_before = ""
-            scan_pos = pos
-            while self.board.is_filled(self.before_cross(scan_pos)):
-                scan_pos = self.before_cross(scan_pos)
-                letters_before = self.board.tile(scan_pos) + letters_before
-            letters_after = ""
-            scan_pos = pos
-            while self.board.is_filled(self.after_cross(scan_pos)):
-                scan_pos = self.after_cross(scan_pos)
-                letters_after = letters_after + self.board.tile(scan_pos)
-            if len(letters_before) == 0 and len(letters_after) == 0:
-                legal_here = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
-            else:
-                legal_here = set()
-                for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
-                    word_formed = letters_before + letter + letters_after
-                    if self.dictionary.is_word(word_formed):
-                        legal_here.add(letter)
-            result[pos] = legal_here
+    def cross_check(self) -> list[int]:
+        """Letter masks for the current direction, indexed by row * board.size + col"""
+        assert self.direction is not None
+        return cross_checks(self.board, self.dictionary, self.stats).masks[self.direction]
+
+    def cross_score(self) -> list[int]:
+        """Face value of the perpendicular tiles next to each square, or -1 where there are none"""
+        assert self.blank_letters is not None
+        size = self.board.size
+        cells = self.board.snapshot()
+        values = [TILE_SCORE[chr(code)] if code != EMPTY else 0 for code in cells]
+        for row, col in self.blank_letters:
+            values[(14 - row) * size + col] = 0
+        # Perpendicular words run down the columns for ACROSS plays and along the rows for DOWN plays
+        line_stride, step = (1, size) if self.direction == Direction.ACROSS else (size, 1)
+        result = [-1] * (size * size)
+        for line in range(size):
+            squares = range(line * line_stride, line * line_stride + size * step, step)
+            # Tiles in the run just before each square, then those in the run just after it
+            total, found = 0, False
+            for square in squares:
+                if found:
+                    result[square] = total
+                if cells[square] != EMPTY:
+                    total, found = total + values[square], True
+                else:
+                    total, found = 0, False
+            total, found = 0, False
+            for square in reversed(squares):
+                if found:
+                    result[square] = max(result[square], 0) + total
+                if cells[square] != EMPTY:
+                    total, found = total + values[square], True
+                else:
+                    total, found = 0, False
         return result
 
+    def timer(self, phase: str) -> AbstractContextManager[None]:
+        return self.stats.timer(phase) if self.stats is not None else nullcontext()
+
+    def start_direction(self, direction: Direction) -> list[CellCoord]:
+        """Set up the per-direction tables and return the anchors"""
+        self.direction = direction
+        with self.timer("cross-checks"):
+            self.cross_check_results = self.cross_check()
+        if self.blank_letters is not None:
+            with self.timer("cross-scores"):
+                self.cross_scores = self.cross_score()
+        with self.timer("anchors"):
+            return self.find_anchors()
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise SolveCancelledError()
+        if self.deadline is not None and self.deadline_passed():
+            raise SolveTimeoutError()
+
+    def check_deadline(self) -> None:
+        """Called for every search node when there is a deadline, looks at the clock now and then"""
+        self.deadline_countdown -= 1
+        if self.deadline_countdown <= 0:
+            self.deadline_countdown = DEADLINE_CHECK_NODES
+            if self.deadline_passed():
+                raise SolveTimeoutError()
+
+    def deadline_passed(self) -> bool:
+        """Whether to stop at the deadline. Running out of time is no reason to pass, so until the
+        first play is found the search goes on past it."""
+        assert self.deadline is not None
+        return time.perf_counter() >= self.deadline and (self.plays_found > 0 or len(self.plays) > 0)
+
     def find_anchors(self) -> list[CellCoord]:
         if self.board.is_first_turn():
             return [(7, 7)]
-        anchors = []
-        for pos in self.board.all_positions():
-            empty = self.board.is_empty(pos)
-            neighbor_filled = self.board.is_filled(self.before(pos)) or \
-                              self.board.is_filled(self.after(pos)) or \
-                              self.board.is_filled(self.before_cross(pos)) or \
-                              self.board.is_filled(self.after_cross(pos))
-            if empty and neighbor_filled:
-                anchors.append(pos)
-        return anchors
-
-    def before_part(self, partial_word: str, current_node: TrieNode, anchor_pos: CellCoord, limit: int) -> None:
+        return self.board.anchors()
+
+    def before_part(self, partial_word: str, current_node: int, anchor_pos: CellCoord, limit: int) -> None:
+        if self.stats is not None:
+            self.stats.nodes_visited += 1
+        if self.deadline is not None:
+            self.check_deadline()
         self.extend_after(partial_word, current_node, anchor_pos, False)
         if limit > 0:
-            for next_letter in current_node.children.keys():
-                if next_letter in self.rack or " " in self.rack:
-                    letter_to_add_back = next_letter if next_letter in self.rack else " "
-                    self.rack.remove(letter_to_add_back)
+            dawg = self.dictionary
+            playable = self.playable()
+            for edge in range(dawg.first_edge[current_node], dawg.first_edge[current_node + 1]):
+                if playable & LETTER_BITS[dawg.edge_letters[edge]]:
+                    slot = self.take(dawg.edge_letters[edge])
                     self.before_part(
-                        partial_word + next_letter,
-                        current_node.children[next_letter],
+                        partial_word + dawg.edge_chars[edge],
+                        dawg.edge_targets[edge],
                         anchor_pos,
                         limit - 1
                     )
-                    self.rack.append(letter_to_add_back)
+                    self.put_back(slot)
 
-    def extend_after(self, partial_word: str, current_node: TrieNode, next_pos: CellCoord, anchor_filled: bool) -> None:
-        if (self.board.is_empty(next_pos) or not self.board.in_bounds(next_pos)) and \
-            current_node.is_word and anchor_filled:
+    def extend_after(self, partial_word: str, current_node: int, next_pos: CellCoord, anchor_filled: bool) -> None:
+        if self.stats is not None:
+            self.stats.nodes_visited += 1
+        if self.deadline is not None:
+            self.check_deadline()
+        dawg = self.dictionary
+        # Each test once per node: is_empty is False off the board too
+        is_empty = self.board.is_empty(next_pos)
+        in_bounds = is_empty or self.board.in_bounds(next_pos)
+        if (is_empty or not in_bounds) and dawg.terminal[current_node] and anchor_filled:
             self.legal_move(partial_word, self.before(next_pos))
-        if self.board.in_bounds(next_pos):
-            if self.board.is_empty(next_pos):
-                for next_letter in current_node.children.keys():
-                    assert self.cross_check_results is not None  # make mypy happy about the next line
-                    if (next_letter in self.rack or " " in self.rack) and next_letter in self.cross_check_results[next_pos]:
-                        letter_to_add_back = next_letter if next_letter in self.rack else " "
-                        self.rack.remove(letter_to_add_back)
-                        self.extend_after(
-                            partial_word + next_letter,
-                            current_node.children[next_letter],
-                            self.after(next_pos),
-                            True
-                        )
-                        self.rack.append(letter_to_add_back)
-            else:
-                existing_letter = self.board.tile(next_pos)
-                if existing_letter in current_node.children.keys():
+        if is_empty:
+            assert self.cross_check_results is not None  # make mypy happy about the next line
+            row, col = next_pos
+            legal_here = self.cross_check_results[row * self.board.size + col] & self.playable()
+            for edge in range(dawg.first_edge[current_node], dawg.first_edge[current_node + 1]):
+                if legal_here & LETTER_BITS[dawg.edge_letters[edge]]:
+                    slot = self.take(dawg.edge_letters[edge])
                     self.extend_after(
-                        partial_word + existing_letter,
-                        current_node.children[existing_letter],
+                        partial_word + dawg.edge_chars[edge],
+                        dawg.edge_targets[edge],
                         self.after(next_pos),
                         True
                     )
+                    self.put_back(slot)
+        elif in_bounds:
+            existing_letter = self.board.tile(next_pos)
+            next_node = dawg.child(current_node, existing_letter)
+            if next_node >= 0:
+                self.extend_after(
+                    partial_word + existing_letter,
+                    next_node,
+                    self.after(next_pos),
+                    True
+                )
 
-    def find_all_options(self):
+    def find_all_options(self) -> list[Any]:
         for direction in Direction:
-            self.direction = direction
-            anchors = self.find_anchors()
-            self.cross_check_results = self.cross_check()
-            for anchor_pos in anchors:
-                if self.board.is_filled(self.before(anchor_pos)):
-                    scan_pos = self.before(anchor_pos)
-                    partial_word = self.board.tile(scan_pos)
-                    while self.board.is_filled(self.before(scan_pos)):
-                        scan_pos = self.before(scan_pos)
-                        partial_word = self.board.tile(scan_pos) + partial_word
-                    pw_node = self.dictionary.lookup(partial_word)
-                    if pw_node is not None:
-                        self.extend_after(
-                            partial_word,
-                            pw_node,
-                            anchor_pos,
-                            False
-                        )
-                else:
-                    limit = 0
-                    scan_pos = anchor_pos
-                    while self.board.is_empty(self.before(scan_pos)) and self.before(scan_pos) not in anchors:
-                        limit = limit + 1
-                        scan_pos = self.before(scan_pos)
-                    self.before_part("", self.dictionary.root, anchor_pos, limit)
+            self.find_options(direction)
         return self.plays
+
+    def find_options(self, direction: Direction, rows: Collection[int] | None = None) -> None:
+        """Plays in one direction, optionally only those through anchors on the given rows"""
+        first_play = len(self.plays)
+        anchors = self.start_direction(direction)
+        with self.timer("generate"):
+            self.generate(anchors, rows)
+        if self.stats is not None:
+            self.stats.plays += len(self.plays) - first_play
+
+    def generate(self, anchors: list[CellCoord], rows: Collection[int] | None) -> None:
+        for index, anchor_pos in enumerate(anchors):
+            if rows is not None and anchor_pos[0] not in rows:
+                continue
+            self.generate_at(anchors, index)
+
+    def generate_at(self, anchors: list[CellCoord], index: int) -> None:
+        """The plays generated from anchors[index]"""
+        anchor_pos = anchors[index]
+        self.check_cancelled()
+        if self.stats is not None:
+            self.stats.anchors += 1
+        if self.board.is_filled(self.before(anchor_pos)):
+            scan_pos = self.before(anchor_pos)
+            partial_word = self.board.tile(scan_pos)
+            while self.board.is_filled(self.before(scan_pos)):
+                scan_pos = self.before(scan_pos)
+                partial_word = self.board.tile(scan_pos) + partial_word
+            pw_node = self.dictionary.walk(partial_word)
+            if pw_node >= 0:
+                self.extend_after(
+                    partial_word,
+                    pw_node,
+                    anchor_pos,
+                    False
+                )
+        else:
+            self.before_part("", 0, anchor_pos, self.left_limit(anchors, anchor_pos))
+
+    def left_limit(self, anchors: list[CellCoord], anchor_pos: CellCoord) -> int:
+        """Empty squares before anchor_pos, up to the previous anchor, that a play from it may cover"""
+        limit = 0
+        scan_pos = anchor_pos
+        while self.board.is_empty(self.before(scan_pos)) and self.before(scan_pos) not in anchors:
+            limit = limit + 1
+            scan_pos = self.before(scan_pos)
+        return limit
+
+    def anchor_bound(self, anchors: list[CellCoord], index: int) -> int:
+        """Upper bound on the score of the plays generate_at(anchors, index) finds, -1 when it finds none
+
+        The main word may take in every tile already on the board within reach and put the rack's
+        best tiles on the best letter and word multipliers within reach, and every square with a
+        perpendicular word may make its best cross-word; the bound adds these up.
+        """
+        masks, blank_letters = self.cross_check_results, self.blank_letters
+        assert masks is not None and blank_letters is not None
+        anchor_pos = anchors[index]
+        size = self.board.size
+        tile_values = sorted((TILE_SCORE[tile] for tile in self.rack), reverse=True)
+        rack_size = len(tile_values)
+
+        def fillable(pos: CellCoord) -> bool:
+            mask = masks[pos[0] * size + pos[1]]
+            return bool(mask & self.rack_mask or mask and self.original_counts[BLANK])
+
+        def tile_value(pos: CellCoord) -> int:
+            return 0 if (14 - pos[0], pos[1]) in blank_letters else TILE_SCORE[self.board.tile(pos)]
+
+        if not fillable(anchor_pos):
+            return -1
+        squares = [anchor_pos]  # empty squares the play may cover
+        existing = 0  # face value of the tiles already on the board it may cover
+        scan_pos = self.before(anchor_pos)
+        if self.board.is_filled(scan_pos):
+            while self.board.is_filled(scan_pos):
+                existing += tile_value(scan_pos)
+                scan_pos = self.before(scan_pos)
+        else:
+            for _ in range(min(self.left_limit(anchors, anchor_pos), rack_size - 1)):
+                if not fillable(scan_pos):
+                    break
+                squares.append(scan_pos)
+                scan_pos = self.before(scan_pos)
+        scan_pos, right_tiles = self.after(anchor_pos), 0
+        while self.board.in_bounds(scan_pos):
+            if self.board.is_filled(scan_pos):
+                existing += tile_value(scan_pos)
+            elif right_tiles == rack_size - 1 or not fillable(scan_pos):
+                break
+            else:
+                squares.append(scan_pos)
+                right_tiles += 1
+            scan_pos = self.after(scan_pos)
+
+        placed = min(rack_size, len(squares))
+        indices = [row * size + col for row, col in squares]
+        letter_multipliers = sorted((LETTER_MULTIPLIERS[square] for square in indices), reverse=True)
+        word_multiplier = 1
+        for multiplier in sorted((WORD_MULTIPLIERS[square] for square in indices), reverse=True)[:placed]:
+            word_multiplier *= multiplier
+        main_word = existing + sum(value * multiplier for value, multiplier in zip(tile_values, letter_multipliers))
+        best_tile = tile_values[0] if tile_values else 0
+        cross_words = sorted(
+            ((self.cross_scores[square] + best_tile * LETTER_MULTIPLIERS[square]) * WORD_MULTIPLIERS[square]
+             for square in indices if self.cross_scores[square] >= 0),
+            reverse=True,
+        )
+        return main_word * word_multiplier + sum(cross_words[:placed]) + (50 if placed == 7 else 0)
+
+    def find_all_plays(self, blank_letters: set[CellCoord]) -> list[Play]:
+        """Like find_all_options, but scores every play while generating it"""
+        self.blank_letters = blank_letters
+        self.find_all_options()
+        return self.plays
+
+    def iter_plays_by_bound(self, blank_letters: set[CellCoord], directions: Collection[Direction] = tuple(Direction)
+                            ) -> Iterator[tuple[Play, tuple[int, int, int]]]:
+        """The plays of find_all_plays, anchor by anchor from the highest anchor_bound down
+
+        Each play comes with its place in the order of find_all_plays. Once score_floor is above
+        the bound of the next anchor, that anchor and all the ones after it are skipped. When the
+        deadline passes, the plays found so far are yielded and timed_out is set, unless there are
+        none yet: then the search goes on until the first play.
+        """
+        self.blank_letters = blank_letters
+        tables = dict()
+        ranked = []
+        for direction in directions:
+            anchors = self.start_direction(direction)
+            tables[direction] = (self.cross_check_results, self.cross_scores, anchors)
+            for index in range(len(anchors)):
+                bound = self.anchor_bound(anchors, index)
+                if bound >= 0:
+                    ranked.append((-bound, direction, index))
+        ranked.sort()
+        for visited, (negative_bound, direction, index) in enumerate(ranked):
+            if self.score_floor is not None and -negative_bound < self.score_floor:
+                if self.stats is not None:
+                    self.stats.anchors_skipped += len(ranked) - visited
+                return
+            self.direction = direction
+            self.cross_check_results, self.cross_scores, anchors = tables[direction]
+            with self.timer("generate"):
+                try:
+                    self.generate_at(anchors, index)
+                except SolveTimeoutError:
+                    # The plays this anchor got to before the deadline are still good
+                    self.timed_out = True
+            if self.stats is not None:
+                self.stats.plays += len(self.plays)
+            self.plays_found += len(self.plays)
+            for sequence, play in enumerate(self.plays):
+                yield play, (direction, index, sequence)
+            self.clear_plays()
+            if self.timed_out:
+                return
+
+    def clear_plays(self) -> None:
+        self.plays.clear()
+
+
+def generate_all_plays(lexicon: Lexicon, board: Board, tiles, blank_letters: set[CellCoord],
+                       pool: "SolverPool | None" = None, cancel_event: Event | None = None,
+                       stats: SolverStats | None = None, leaves: "LeaveTable | None" = None) -> list[Play]:
+    """Scored plays, best last, without duplicate (word, score) pairs
+
+    stats, when given, is filled in by the solve; it is left untouched when solving on a pool.
+    leaves, when given, sets Play.leave on every play; the plays are still ordered by score.
+    """
+    if pool is not None:
+        plays = pool.find_all_plays(board, tiles, blank_letters, cancel_event)
+        if leaves is not None:
+            plays = [replace(play, leave=leaves.value(leave_counts(board, play, tiles))) for play in plays]
+    else:
+        solver = SolverState(lexicon.dawg, board, tiles)
+        solver.cancel_event = cancel_event
+        solver.stats = stats
+        solver.leaves = leaves
+        plays = solver.find_all_plays(blank_letters)
+    valid_plays = []
+    seen_word_scores = set()  # Track (word, score) combinations to avoid duplicates
+    is_first_turn = board.is_first_turn()
+    for play in plays:
+        # Skip vertical plays on first turn (duplicates of horizontal due to symmetry)
+        if is_first_turn and play.pos.dir == Direction.DOWN:
+            continue
+        word_score_pair = (play.word, play.score)
+        if word_score_pair not in seen_word_scores:
+            seen_word_scores.add(word_score_pair)
+            valid_plays.append(play)
+    return sorted(valid_plays)
+
+
+class TopPlays:
+    """The k best plays offered, by score and then word, keeping the first of each (word, score) pair
+
+    Plays may be offered out of order with their place in generation order, then the earliest one
+    of a (word, score) pair is kept, the same one generate_all_plays keeps.
+    """
+
+    def __init__(self, k: int) -> None:
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        self.k = k
+        # [score, word, order, play]; (word, score) pairs are unique, so orders and plays are never compared
+        self.heap: list[list[Any]] = []
+        self.entries: dict[tuple[str, int], list[Any]] = dict()
+        self.offered = 0
+
+    @property
+    def floor(self) -> int | None:
+        """Lowest score a new play can have and still get in, once there are k plays"""
+        return self.heap[0][0] if len(self.heap) == self.k else None
+
+    def offer(self, play: Play, order: Any = None) -> None:
+        """Add play if it is among the k best; order defaults to the order plays are offered in"""
+        if order is None:
+            order = self.offered
+        self.offered += 1
+        key = (play.word, play.score)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if order < entry[2]:
+                entry[2], entry[3] = order, play
+            return
+        entry = [play.score, play.word, order, play]
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            evicted = heapq.heapreplace(self.heap, entry)
+            del self.entries[(evicted[1], evicted[0])]
+        else:
+            return
+        self.entries[key] = entry
+
+    def best(self) -> list[Play]:
+        """Best last, like generate_all_plays"""
+        return [entry[3] for entry in sorted(self.heap, key=lambda entry: entry[:2])]
+
+
+@dataclass
+class SolveResult:
+    plays: list[Play]  # best last
+    complete: bool  # False when the deadline stopped the search, which it only does once there is a play
+
+
+def best_plays(lexicon: Lexicon, board: Board, tiles, blank_letters: set[CellCoord], k: int,
+               exclude: Callable[[str], bool] | None = None, score_floor: int | None = None,
+               pool: "SolverPool | None" = None, cancel_event: Event | None = None,
+               stats: SolverStats | None = None, leaves: "LeaveTable | None" = None) -> list[Play]:
+    """The last k plays of generate_all_plays that exclude doesn't reject and that score at least score_floor
+
+    Anchors are searched from the highest score bound down and plays are streamed into a k-play
+    heap instead of being collected and sorted. Once the heap is full its lowest score becomes the
+    solver's floor, so weaker plays are not even built and anchors that can't reach it are skipped.
+    On a pool, the pool's plays are filtered afterwards instead.
+    """
+    return solve_best_plays(lexicon, board, tiles, blank_letters, k, None, exclude, score_floor, pool, cancel_event,
+                            stats, leaves).plays
+
+
+def solve_best_plays(lexicon: Lexicon, board: Board, tiles, blank_letters: set[CellCoord], k: int,
+                     deadline_ms: int | None = None, exclude: Callable[[str], bool] | None = None,
+                     score_floor: int | None = None, pool: "SolverPool | None" = None,
+                     cancel_event: Event | None = None, stats: SolverStats | None = None,
+                     leaves: "LeaveTable | None" = None) -> SolveResult:
+    """best_plays that stops after deadline_ms with the best plays found so far
+
+    The most promising anchors are searched first, so a search cut short has usually found the
+    best play already. The search never stops before it has found a play, so an empty result is
+    complete and means there is no play. Searches on a pool always run to the end.
+    """
+    top = TopPlays(k)
+    # As in generate_all_plays, vertical first plays are mirror images of horizontal ones
+    directions = (Direction.ACROSS,) if board.is_first_turn() else tuple(Direction)
+    if pool is not None:
+        for play in pool.find_all_plays(board, tiles, blank_letters, cancel_event):
+            if play.pos.dir in directions and (exclude is None or not exclude(play.word)) \
+                    and (score_floor is None or play.score >= score_floor):
+                top.offer(play)
+        plays = top.best()
+        if leaves is not None:
+            plays = [replace(play, leave=leaves.value(leave_counts(board, play, tiles))) for play in plays]
+        return SolveResult(plays, True)
+    solver = SolverState(lexicon.dawg, board, tiles)
+    solver.cancel_event = cancel_event
+    solver.stats = stats
+    solver.leaves = leaves
+    solver.exclude = exclude
+    solver.score_floor = score_floor
+    if deadline_ms is not None:
+        solver.deadline = time.perf_counter() + deadline_ms / 1000
+    for play, order in solver.iter_plays_by_bound(blank_letters, directions):
+        top.offer(play, order)
+        if top.floor is not None and (solver.score_floor is None or top.floor > solver.score_floor):
+            solver.score_floor = top.floor
+    return SolveResult(top.best(), not solver.timed_out)
@@ -0,0 +1,91 @@
+# Move generation off the game loop.
+# A solve runs on a background thread, against a copy of the board, while the window keeps
+# drawing; the game polls the returned future every frame. When SOLVER_WORKERS is set the thread
+# only waits on the process pool, otherwise the solve shares the interpreter with the game loop.
+
+from collections.abc import Callable, Collection
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Event
+
+from board import Board, CellCoord
+from lexicon import Lexicon
+from parallel import SolverPool
+from solver import SolveResult, generate_all_plays, solve_best_plays
+
+# What a solve depends on: board version, rack (sorted, since shuffling it changes no play), blank squares,
+# then the top and the size of exclude (the known words only ever grow, so their count stands for their contents)
+SolveKey = tuple[int, tuple[str, ...], frozenset[CellCoord], int | None, int]
+
+
+class SolverService:
+    def __init__(self, lexicon: Lexicon, pool: SolverPool | None = None,
+                 deadline_ms: int | None = None) -> None:
+        """deadline_ms bounds solves for the top plays, which then return the best plays found in time"""
+        self.lexicon = lexicon
+        self.pool = pool
+        self.deadline_ms = deadline_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solver")
+        self.key: SolveKey | None = None
+        self.future: Future[SolveResult] | None = None
+        self.cancel_event = Event()
+
+    def solve(self, board: Board, tiles: list[str], blank_letters: set[CellCoord], top: int | None = None,
+              exclude: Collection[str] = frozenset()) -> Future[SolveResult]:
+        """The future plays for tiles on board, starting a new solve unless one for the same position exists
+
+        With top, only the best top plays whose words are not in exclude are found (see best_plays),
+        within the service's deadline if it has one; the result says whether the search finished.
+        """
+        key = (board.version, tuple(sorted(tiles)), frozenset(blank_letters), top, len(exclude))
+        if self.future is None or key != self.key:
+            self.cancel()
+            self.key = key
+            if top is None:
+                self.future = self.executor.submit(
+                    _all_plays, self.lexicon, board.copy(), tiles.copy(), set(blank_letters),
+                    self.pool, self.cancel_event,
+                )
+            else:
+                self.future = self.executor.submit(
+                    _solve_plays, self.lexicon, board.copy(), tiles.copy(), set(blank_letters), top,
+                    self.deadline_ms, frozenset(exclude).__contains__ if exclude else None, self.pool,
+                    self.cancel_event,
+                )
+        return self.future
+
+    def poll(self, board: Board, tiles: list[str], blank_letters: set[CellCoord], top: int | None = None,
+             exclude: Collection[str] = frozenset()) -> SolveResult | None:
+        """The result once it is ready, None while still thinking"""
+        future = self.solve(board, tiles, blank_letters, top, exclude)
+        return future.result() if future.done() else None
+
+    @property
+    def thinking(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def cancel(self) -> None:
+        """Abandon the current solve, for when the position it was started for is gone"""
+        if self.future is not None:
+            self.cancel_event.set()
+            self.future.cancel()
+            # The running solve keeps the old event, so it still sees the cancellation
+            self.cancel_event = Event()
+        self.key = None
+        self.future = None
+
+    def close(self) -> None:
+        self.cancel()
+        self.executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.close()
+
+
+def _all_plays(lexicon: Lexicon, board: Board, tiles: list[str], blank_letters: set[CellCoord],
+               pool: SolverPool | None, cancel_event: Event) -> SolveResult:
+    return SolveResult(generate_all_plays(lexicon, board, tiles, blank_letters, pool, cancel_event), True)
+
+
+def _solve_plays(lexicon: Lexicon, board: Board, tiles: list[str], blank_letters: set[CellCoord], top: int,
+                 deadline_ms: int | None, exclude: Callable[[str], bool] | None, pool: SolverPool | None,
+                 cancel_event: Event) -> SolveResult:
+    return solve_best_plays(lexicon, board, tiles, blank_letters, top, deadline_ms, exclude, None, pool, cancel_event)
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from benchmark import load_positions
+from lexicon import Lexicon, build_lexicon, read_word_list
+from solver import best_plays, solve_best_plays
+from solver_service import SolverService
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+POSITIONS = load_positions(os.path.join(HERE, "benchmarks", "positions.json"))
+
+
+@pytest.fixture(scope="module")
+def lexicon() -> Lexicon:
+    return build_lexicon(read_word_list(os.path.join(HERE, "..", "dictionary", "opsd_4th_ed.txt")))
+
+
+@pytest.mark.parametrize("deadline_ms", [0, 1])
+@pytest.mark.parametrize("position", POSITIONS, ids=[position.name for position in POSITIONS])
+def test_tiny_deadline_never_turns_into_a_pass(lexicon, position, deadline_ms):
+    full = best_plays(lexicon, position.board.copy(), position.rack.copy(), set(position.blanks), 1)
+    result = solve_best_plays(lexicon, position.board.copy(), position.rack.copy(), set(position.blanks), 1,
+                              deadline_ms)
+    if full:
+        assert result.plays
+    else:
+        assert result.plays == [] and result.complete
+    if result.complete:
+        assert result.plays == full
+
+
+def test_deadline_search_without_plays_is_complete(lexicon):
+    position = POSITIONS[-1]
+    result = solve_best_plays(lexicon, position.board.copy(), position.rack.copy(), set(position.blanks), 1, 0,
+                              exclude=lambda word: True)
+    assert result.plays == [] and result.complete
+
+
+def test_shuffled_rack_reuses_the_solve(lexicon):
+    position = POSITIONS[0]
+    service = SolverService(lexicon)
+    try:
+        future = service.solve(position.board, position.rack, set(position.blanks), 1)
+        shuffled = position.rack[::-1]
+        assert service.solve(position.board, shuffled, set(position.blanks), 1) is future
+    finally:
+        service.close()